@@ -39,12 +39,12 @@ export async function POST(req: Request) {
 
     sandbox.commands.run("uv run --directory /home/user/coding-agent uvicorn src.main:app --host 0.0.0.0 --port 8000")
 
-    // Wait for FastAPI server to be healthy with retry logic
+    // Wait for FastAPI server to be ready (agent warmed up and validated) with retry logic
     const host = sandbox.getHost(8000)
     let healthCheckPassed = false
     for (let i = 0; i < 30; i++) {
       try {
-        const healthResponse = await fetch(`https://${host}/health`, {
+        const healthResponse = await fetch(`https://${host}/ready`, {
           signal: AbortSignal.timeout(2000)
         })
         if (healthResponse.ok) {
@@ -0,0 +1,298 @@
+"""Resource-aware admission control for generations.
+
+The sandbox is small (2 CPUs, 2 GB RAM) and the agent's Bash tool runs
+`next build`, `tsc` and `npm install` next to the dev server, so starting a
+generation while the machine is loaded slows everything down. Before a
+generation starts, current load is read from the kernel:
+
+- CPU: load average per CPU and CPU pressure (PSI ``some avg10``)
+- Memory: usage against the cgroup limit and memory pressure
+- Processes: number of descendants of this server (agent CLI, tools, dev server)
+
+and compared against configurable thresholds. Below the throttle thresholds a
+generation is admitted as is; above them it is admitted with a lower process
+priority; above the reject thresholds it waits in a bounded queue for load to
+drop, and is rejected with a retry delay once the queue is full or load has
+not dropped by the end of the wait.
+
+The server runs one session at a time and requests arriving while it runs
+join it, so at most one generation is ever queued: the active session. New
+requests arriving while it waits are rejected if load is still too high.
+
+Cgroup v2 files are preferred, falling back to system-wide ``/proc`` files.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from pathlib import Path
+from typing import Literal
+
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+CGROUP_ROOT = Path("/sys/fs/cgroup")
+PROC_ROOT = Path("/proc")
+
+
+class LoadSnapshot(BaseModel):
+    """Current resource load."""
+
+    cpu_load: float  # 1-minute load average per CPU
+    cpu_pressure: float  # % of time some tasks stalled on CPU (avg10)
+    memory_used: float  # fraction of the memory limit in use
+    memory_pressure: float  # % of time some tasks stalled on memory (avg10)
+    child_processes: int  # descendants of this server process
+
+
+class AdmissionThresholds(BaseModel):
+    """Throttle and reject thresholds for each load metric."""
+
+    cpu_load_throttle: float = 1.0
+    cpu_load_reject: float = 2.0
+    cpu_pressure_throttle: float = 40.0
+    cpu_pressure_reject: float = 80.0
+    memory_used_throttle: float = 0.80
+    memory_used_reject: float = 0.92
+    memory_pressure_throttle: float = 10.0
+    memory_pressure_reject: float = 30.0
+    child_processes_throttle: int = 10
+    child_processes_reject: int = 25
+
+    throttle_niceness: int = 10  # Niceness applied to throttled agent processes
+    max_queue: int = 1  # Generations allowed to wait for load to drop (one session at a time: 0 or 1)
+    queue_timeout: float = 60.0  # Seconds a queued generation waits before it is rejected
+    retry_after: int = 15  # Retry-After seconds sent with rejections
+
+    @classmethod
+    def from_env(cls) -> "AdmissionThresholds":
+        """Read thresholds from ADMISSION_<FIELD> environment variables."""
+        overrides = {
+            name: os.environ[f"ADMISSION_{name.upper()}"]
+            for name in cls.model_fields
+            if f"ADMISSION_{name.upper()}" in os.environ
+        }
+        return cls.model_validate(overrides)
+
+
+class AdmissionDecision(BaseModel):
+    """Outcome of an admission check."""
+
+    action: Literal["admit", "throttle", "queue", "reject"]
+    reasons: list[str]
+    load: LoadSnapshot
+    timestamp: float
+    session_id: str | None = None
+    niceness: int = 0
+    retry_after: int | None = None
+    _released: bool = False  # Queue slot given back (private, not serialized)
+
+
+def read_load() -> LoadSnapshot:
+    """Read current load from cgroup and /proc files."""
+    cpus = os.cpu_count() or 1
+    try:
+        cpu_load = os.getloadavg()[0] / cpus
+    except OSError:
+        cpu_load = 0.0
+
+    return LoadSnapshot(
+        cpu_load=cpu_load,
+        cpu_pressure=_read_pressure("cpu"),
+        memory_used=_read_memory_used(),
+        memory_pressure=_read_pressure("memory"),
+        child_processes=len(list_descendants(os.getpid())),
+    )
+
+
+def list_descendants(pid: int) -> set[int]:
+    """Find all descendant process ids of pid."""
+    children: dict[int, list[int]] = {}
+    for entry in PROC_ROOT.iterdir():
+        if not entry.name.isdigit():
+            continue
+        try:
+            stat = (entry / "stat").read_text()
+        except OSError:
+            continue  # Process exited while scanning
+        # Fields after the parenthesised command name: state, ppid, ...
+        ppid = int(stat.rsplit(")", 1)[1].split()[1])
+        children.setdefault(ppid, []).append(int(entry.name))
+
+    descendants: set[int] = set()
+    pending = [pid]
+    while pending:
+        for child in children.get(pending.pop(), []):
+            if child not in descendants:
+                descendants.add(child)
+                pending.append(child)
+    return descendants
+
+
+def renice(pids: set[int], niceness: int) -> None:
+    """Lower the priority of processes, ignoring ones that already exited."""
+    for pid in pids:
+        try:
+            os.setpriority(os.PRIO_PROCESS, pid, niceness)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+
+def _read_pressure(resource: str) -> float:
+    """Read the PSI `some avg10` value for a resource (0 if unavailable)."""
+    for path in (CGROUP_ROOT / f"{resource}.pressure", PROC_ROOT / "pressure" / resource):
+        try:
+            lines = path.read_text().splitlines()
+        except OSError:
+            continue
+        for line in lines:
+            if line.startswith("some "):
+                fields = dict(field.split("=") for field in line.split()[1:])
+                return float(fields.get("avg10", 0.0))
+    return 0.0
+
+
+def _read_memory_used() -> float:
+    """Read the fraction of memory in use, preferring the cgroup limit."""
+    try:
+        limit = (CGROUP_ROOT / "memory.max").read_text().strip()
+        current = int((CGROUP_ROOT / "memory.current").read_text())
+        if limit != "max":
+            return current / int(limit)
+    except (OSError, ValueError):
+        pass
+
+    try:
+        meminfo = {
+            line.split(":")[0]: int(line.split()[1])
+            for line in (PROC_ROOT / "meminfo").read_text().splitlines()
+        }
+        return 1 - meminfo["MemAvailable"] / meminfo["MemTotal"]
+    except (OSError, ValueError, KeyError, ZeroDivisionError):
+        return 0.0
+
+
+class OverloadedError(Exception):
+    """Raised when a queued generation is rejected because load did not drop."""
+
+    def __init__(self, decision: AdmissionDecision):
+        super().__init__(f"Sandbox overloaded: {', '.join(decision.reasons)}")
+        self.decision = decision
+
+
+class AdmissionController:
+    """Decides whether a generation may start given current load."""
+
+    def __init__(self, thresholds: AdmissionThresholds | None = None, history: int = 100):
+        self.thresholds = thresholds or AdmissionThresholds()
+        self.decisions: deque[AdmissionDecision] = deque(maxlen=history)
+        self.counts: dict[str, int] = {"admit": 0, "throttle": 0, "queue": 0, "reject": 0}
+        self.queued = 0
+
+    def evaluate(self, load: LoadSnapshot) -> tuple[Literal["admit", "throttle", "reject"], list[str]]:
+        """Classify load against the thresholds, returning the level and reasons."""
+        t = self.thresholds
+        metrics = [
+            ("cpu_load", load.cpu_load, t.cpu_load_throttle, t.cpu_load_reject),
+            ("cpu_pressure", load.cpu_pressure, t.cpu_pressure_throttle, t.cpu_pressure_reject),
+            ("memory_used", load.memory_used, t.memory_used_throttle, t.memory_used_reject),
+            ("memory_pressure", load.memory_pressure, t.memory_pressure_throttle, t.memory_pressure_reject),
+            ("child_processes", load.child_processes, t.child_processes_throttle, t.child_processes_reject),
+        ]
+
+        rejects = [f"{name}={value:g} >= {reject:g}" for name, value, _, reject in metrics if value >= reject]
+        if rejects:
+            return "reject", rejects
+        throttles = [f"{name}={value:g} >= {throttle:g}" for name, value, throttle, _ in metrics if value >= throttle]
+        if throttles:
+            return "throttle", throttles
+        return "admit", []
+
+    async def check(self, session_id: str | None = None, allow_queue: bool = True) -> AdmissionDecision:
+        """Decide whether a new generation is accepted, without waiting for capacity.
+
+        Returns a `reject` decision when load is over the reject thresholds
+        and the queue is full; otherwise `admit`, `throttle` or `queue`. A
+        `queue` decision reserves a queue slot that must be given back with
+        `release`. With allow_queue false, reject-level load is always rejected.
+        """
+        load = await asyncio.to_thread(read_load)
+        level, reasons = self.evaluate(load)
+
+        if level == "reject":
+            if allow_queue and self.queued < self.thresholds.max_queue:
+                # Reserve the queue slot now; the caller releases it
+                self.queued += 1
+                return self._record("queue", reasons, load, session_id)
+            return self._record(
+                "reject", reasons, load, session_id, retry_after=self.thresholds.retry_after
+            )
+        return self._record(level, reasons, load, session_id)
+
+    async def wait_for_capacity(self, decision: AdmissionDecision) -> AdmissionDecision:
+        """Wait in the queue until load drops below the reject thresholds.
+
+        Returns a `reject` decision if load is still at reject level when the
+        queue timeout passes, so a sandbox that stays overloaded sheds load.
+        """
+        load = decision.load
+        deadline = time.monotonic() + self.thresholds.queue_timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(1.0)
+            load = await asyncio.to_thread(read_load)
+            level, reasons = self.evaluate(load)
+            if level != "reject":
+                return self._record(level, reasons, load, decision.session_id)
+        level, reasons = self.evaluate(load)
+        if level != "reject":
+            return self._record(level, reasons, load, decision.session_id)
+        return self._record(
+            "reject",
+            ["queue timeout"] + reasons,
+            load,
+            decision.session_id,
+            retry_after=self.thresholds.retry_after,
+        )
+
+    def release(self, decision: AdmissionDecision | None) -> None:
+        """Give back the queue slot reserved by a `queue` decision (once)."""
+        if decision is None or decision.action != "queue" or decision._released:
+            return
+        decision._released = True
+        self.queued -= 1
+
+    def status(self) -> dict:
+        """Admission state for monitoring."""
+        return {
+            "thresholds": self.thresholds.model_dump(),
+            "queued": self.queued,
+            "counts": dict(self.counts),
+            "decisions": [decision.model_dump() for decision in self.decisions],
+        }
+
+    def _record(
+        self,
+        action: Literal["admit", "throttle", "queue", "reject"],
+        reasons: list[str],
+        load: LoadSnapshot,
+        session_id: str | None,
+        retry_after: int | None = None,
+    ) -> AdmissionDecision:
+        """Create a decision and add it to the history."""
+        decision = AdmissionDecision(
+            action=action,
+            reasons=reasons,
+            load=load,
+            timestamp=time.time(),
+            session_id=session_id,
+            niceness=self.thresholds.throttle_niceness if action == "throttle" else 0,
+            retry_after=retry_after,
+        )
+        self.decisions.append(decision)
+        self.counts[action] += 1
+        if action != "admit":
+            logger.info(f"Admission {action} for session {session_id}: {', '.join(reasons)}")
+        return decision
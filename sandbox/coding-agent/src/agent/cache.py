@@ -0,0 +1,275 @@
+"""Prompt-level generation cache.
+
+A cache entry records the outcome of one successful generation: the file
+changes it made to the workdir and the event stream it produced. Entries are
+keyed by prompt, model, system prompt hash and a hash of the initial workdir
+tree, so a hit means the same request ran against the same starting files.
+Generations that change dependencies are not cached, as ``node_modules`` is
+not recorded.
+
+Layout on disk::
+
+    <cache_dir>/
+    ├── index.json              # LRU order and entry sizes
+    └── <key>/
+        ├── manifest.json       # changed and deleted paths, recorded workdir
+        ├── events.json         # recorded AgentEvents
+        └── files/              # contents of changed files
+
+All methods are blocking filesystem work; call them via ``asyncio.to_thread``.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any
+
+from pydantic import BaseModel
+
+from ..models.events import AgentEvent
+
+logger = logging.getLogger(__name__)
+
+# Directories never hashed or recorded (dependencies and build output)
+IGNORED_DIRS = {"node_modules", ".next", ".git", ".turbo", ".vercel"}
+
+# Files that change installed dependencies; node_modules isn't recorded, so
+# generations that touch them can't be replayed faithfully and aren't cached
+DEPENDENCY_FILES = {"package.json", "package-lock.json", "npm-shrinkwrap.json", "yarn.lock", "pnpm-lock.yaml", "bun.lockb"}
+
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "coding-agent" / "generations"
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+class CacheEntry(BaseModel):
+    """A recorded generation loaded from the cache."""
+
+    key: str
+    events: list[AgentEvent]
+    changed: list[str]  # relative paths written by the generation
+    deleted: list[str]  # relative paths removed by the generation
+    files_dir: Path
+    workdir: str | None = None  # workdir the generation ran in (absolute paths in events)
+
+
+def snapshot_tree(workdir: str) -> dict[str, str]:
+    """Map each file under workdir (relative path) to its content digest."""
+    root = Path(workdir)
+    tree: dict[str, str] = {}
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if d not in IGNORED_DIRS]
+        for filename in filenames:
+            path = Path(dirpath) / filename
+            if not path.is_file():
+                continue
+            digest = hashlib.sha256(path.read_bytes()).hexdigest()
+            tree[path.relative_to(root).as_posix()] = digest
+    return tree
+
+
+def hash_tree(tree: dict[str, str]) -> str:
+    """Hash a tree snapshot into a single digest."""
+    hasher = hashlib.sha256()
+    for rel_path in sorted(tree):
+        hasher.update(f"{rel_path}\0{tree[rel_path]}\n".encode())
+    return hasher.hexdigest()
+
+
+def make_cache_key(prompt: str, model: str, system_prompt: str, tree_hash: str) -> str:
+    """Build the cache key for a generation request."""
+    system_prompt_hash = hashlib.sha256(system_prompt.encode()).hexdigest()
+    material = json.dumps([prompt, model, system_prompt_hash, tree_hash])
+    return hashlib.sha256(material.encode()).hexdigest()[:32]
+
+
+class GenerationCache:
+    """Size-bounded LRU cache of recorded generations."""
+
+    def __init__(self, cache_dir: Path = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # key -> entry size in bytes, least recently used first
+        self._index: OrderedDict[str, int] = OrderedDict()
+        self._load_index()
+
+    @classmethod
+    def from_env(cls) -> "GenerationCache":
+        """Create a cache configured from environment variables."""
+        cache_dir = Path(os.environ.get("GENERATION_CACHE_DIR", str(DEFAULT_CACHE_DIR)))
+        max_bytes = int(os.environ.get("GENERATION_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES))
+        return cls(cache_dir=cache_dir, max_bytes=max_bytes)
+
+    @property
+    def total_bytes(self) -> int:
+        """Total size of all cached entries."""
+        return sum(self._index.values())
+
+    def get(self, key: str) -> CacheEntry | None:
+        """Load an entry and mark it as most recently used."""
+        with self._lock:
+            if key not in self._index:
+                return None
+            entry_dir = self.cache_dir / key
+            try:
+                manifest = json.loads((entry_dir / "manifest.json").read_text())
+                raw_events = json.loads((entry_dir / "events.json").read_text())
+            except (OSError, ValueError) as e:
+                logger.warning(f"Dropping unreadable cache entry {key}: {e}")
+                self._remove(key)
+                self._save_index()
+                return None
+
+            self._index.move_to_end(key)
+            self._save_index()
+
+        return CacheEntry(
+            key=key,
+            events=[AgentEvent.model_validate(event) for event in raw_events],
+            changed=manifest["changed"],
+            deleted=manifest["deleted"],
+            files_dir=entry_dir / "files",
+            workdir=manifest.get("workdir"),
+        )
+
+    def put(
+        self,
+        key: str,
+        workdir: str,
+        before: dict[str, str],
+        after: dict[str, str],
+        events: list[AgentEvent],
+    ) -> None:
+        """Record a generation's file changes and events, evicting old entries as needed."""
+        changed = [path for path, digest in after.items() if before.get(path) != digest]
+        deleted = [path for path in before if path not in after]
+        dependency_changes = [path for path in changed + deleted if Path(path).name in DEPENDENCY_FILES]
+        if dependency_changes:
+            logger.info(f"Not caching generation {key}: it changed dependencies ({', '.join(dependency_changes)})")
+            return
+
+        with self._lock:
+            entry_dir = self.cache_dir / key
+            self._remove(key)
+            files_dir = entry_dir / "files"
+            files_dir.mkdir(parents=True)
+
+            for rel_path in changed:
+                target = files_dir / rel_path
+                target.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copy2(Path(workdir) / rel_path, target)
+
+            (entry_dir / "manifest.json").write_text(
+                json.dumps({"changed": changed, "deleted": deleted, "workdir": workdir})
+            )
+            (entry_dir / "events.json").write_text(
+                json.dumps([event.model_dump() for event in events])
+            )
+
+            self._index[key] = _dir_size(entry_dir)
+            self._evict()
+            self._save_index()
+
+        logger.info(f"Cached generation {key}: {len(changed)} changed, {len(deleted)} deleted")
+
+    def restore(self, entry: CacheEntry, workdir: str) -> None:
+        """Apply a cached entry's file changes to workdir, all or nothing.
+
+        If applying fails partway, the files already touched are put back
+        before the error is re-raised.
+        """
+        root = Path(workdir)
+        backup = Path(tempfile.mkdtemp(prefix="generation-restore-"))
+        touched: list[str] = []
+        try:
+            for rel_path in entry.changed + entry.deleted:
+                if (root / rel_path).is_file():
+                    (backup / rel_path).parent.mkdir(parents=True, exist_ok=True)
+                    shutil.copy2(root / rel_path, backup / rel_path)
+
+            for rel_path in entry.changed:
+                touched.append(rel_path)
+                target = root / rel_path
+                target.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copy2(entry.files_dir / rel_path, target)
+            for rel_path in entry.deleted:
+                touched.append(rel_path)
+                (root / rel_path).unlink(missing_ok=True)
+        except OSError:
+            self._undo_restore(root, backup, touched)
+            raise
+        finally:
+            shutil.rmtree(backup, ignore_errors=True)
+
+    def _undo_restore(self, root: Path, backup: Path, touched: list[str]) -> None:
+        """Put back files touched by a failed restore from their backups."""
+        for rel_path in touched:
+            try:
+                if (backup / rel_path).is_file():
+                    shutil.copy2(backup / rel_path, root / rel_path)
+                else:
+                    (root / rel_path).unlink(missing_ok=True)
+            except OSError as e:
+                logger.error(f"Failed to undo restore of {rel_path}: {e}")
+
+    def _evict(self) -> None:
+        """Drop least recently used entries until under the size bound."""
+        while self._index and self.total_bytes > self.max_bytes:
+            key = next(iter(self._index))
+            logger.info(f"Evicting cached generation {key}")
+            self._remove(key)
+
+    def _remove(self, key: str) -> None:
+        """Remove an entry from disk and the index."""
+        self._index.pop(key, None)
+        shutil.rmtree(self.cache_dir / key, ignore_errors=True)
+
+    def _load_index(self) -> None:
+        """Load the LRU index, ignoring entries missing on disk."""
+        index_file = self.cache_dir / "index.json"
+        if not index_file.exists():
+            return
+        try:
+            entries = json.loads(index_file.read_text())
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable cache index: {e}")
+            return
+        for key, size in entries:
+            if (self.cache_dir / key).is_dir():
+                self._index[key] = size
+
+    def _save_index(self) -> None:
+        """Persist the LRU index."""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        (self.cache_dir / "index.json").write_text(json.dumps(list(self._index.items())))
+
+
+def rebase_paths(value: Any, old_workdir: str, new_workdir: str) -> Any:
+    """Rewrite absolute paths under old_workdir to new_workdir in event data."""
+    if old_workdir == new_workdir:
+        return value
+    # Whole path components only: /sessions/a must not match /sessions/ab
+    pattern = re.compile(re.escape(old_workdir.rstrip("/")) + r"(?![\w.-])")
+    return _rebase(value, pattern, new_workdir.rstrip("/"))
+
+
+def _rebase(value: Any, pattern: re.Pattern[str], replacement: str) -> Any:
+    if isinstance(value, str):
+        return pattern.sub(lambda _: replacement, value)
+    if isinstance(value, dict):
+        return {key: _rebase(item, pattern, replacement) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_rebase(item, pattern, replacement) for item in value]
+    return value
+
+
+def _dir_size(path: Path) -> int:
+    """Total size of files under path."""
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
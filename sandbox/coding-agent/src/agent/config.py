@@ -0,0 +1,141 @@
+"""Agent configuration loaded once per server process.
+
+The system prompt and API environment are loaded when the server starts.
+Importing the Claude Agent SDK, building the `ClaudeAgentOptions` template
+and validating the CLI binary are slower, so they run in a background
+warm-up; the server reports ready once it finishes.
+"""
+
+import dataclasses
+import logging
+import os
+import shutil
+import subprocess
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from claude_agent_sdk import ClaudeAgentOptions, HookMatcher
+
+logger = logging.getLogger(__name__)
+
+ALLOWED_TOOLS = ["Read", "Write", "Edit", "Bash", "Glob", "Grep"]
+
+
+class AgentConfig:
+    """System prompt, API settings and agent options shared by all runs."""
+
+    def __init__(self):
+        self.timings_ms: dict[str, float] = {}
+        self.errors: list[str] = []
+        self.ready = False
+        self.cli_path: str | None = None
+        self.options_template: "ClaudeAgentOptions | None" = None
+
+        started = time.perf_counter()
+        self._configure_api()
+        self.model = os.environ["ANTHROPIC_MODEL"]
+        self.base_url = os.environ["ANTHROPIC_BASE_URL"]
+        self.system_prompt = self._load_system_prompt()
+        self.timings_ms["config"] = (time.perf_counter() - started) * 1000
+
+    def _configure_api(self) -> None:
+        """Configure Anthropic API environment variables."""
+        os.environ["ANTHROPIC_BASE_URL"] = os.environ.get(
+            "ANTHROPIC_BASE_URL", "https://api.novita.ai/anthropic"
+        )
+        os.environ["ANTHROPIC_API_KEY"] = os.environ.get("ANTHROPIC_AUTH_TOKEN", "")
+        os.environ["ANTHROPIC_MODEL"] = os.environ.get("ANTHROPIC_MODEL", "")
+
+    def _load_system_prompt(self) -> str:
+        """Load system prompt from file."""
+        prompt_file = Path(__file__).parent / "prompts" / "system_prompt.txt"
+        return prompt_file.read_text()
+
+    def warm_up(self) -> None:
+        """Import the SDK, build the options template and validate the CLI.
+
+        Blocking; run via ``asyncio.to_thread``.
+        """
+        started = time.perf_counter()
+        import claude_agent_sdk
+
+        self.timings_ms["sdk_import"] = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        self.cli_path = self._find_cli(Path(claude_agent_sdk.__file__).parent)
+        self.options_template = claude_agent_sdk.ClaudeAgentOptions(
+            resume=None,
+            system_prompt=self.system_prompt,
+            setting_sources=["project"],
+            allowed_tools=ALLOWED_TOOLS,
+            permission_mode="bypassPermissions",
+            cli_path=self.cli_path,
+        )
+        self.timings_ms["options"] = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        errors = self._validate()
+        self.timings_ms["cli_check"] = (time.perf_counter() - started) * 1000
+
+        self.errors = errors
+        self.ready = not errors
+        if errors:
+            logger.error(f"Agent warm-up failed: {'; '.join(errors)}")
+        logger.info(
+            "Agent warm-up timings: "
+            + ", ".join(f"{name}={ms:.0f}ms" for name, ms in self.timings_ms.items())
+        )
+
+    def create_options(
+        self, workdir: str, hooks: dict[str, list["HookMatcher"]]
+    ) -> "ClaudeAgentOptions":
+        """Create options for a run from the shared template.
+
+        Raises RuntimeError if warm-up failed before the template was built;
+        warming up here would block the event loop.
+        """
+        if self.options_template is None:
+            reason = "; ".join(self.errors) or "warm-up has not finished"
+            raise RuntimeError(f"Agent is not ready: {reason}")
+        return dataclasses.replace(self.options_template, cwd=workdir, hooks=hooks)
+
+    def status(self) -> dict[str, Any]:
+        """Readiness state for the /ready endpoint."""
+        return {
+            "ready": self.ready,
+            "model": self.model,
+            "cli_path": self.cli_path,
+            "errors": self.errors,
+            "timings_ms": {name: round(ms, 1) for name, ms in self.timings_ms.items()},
+        }
+
+    def _find_cli(self, sdk_dir: Path) -> str | None:
+        """Locate the Claude CLI: bundled with the SDK, else on PATH."""
+        bundled = sdk_dir / "_bundled" / "claude"
+        if bundled.is_file():
+            return str(bundled)
+        return shutil.which("claude")
+
+    def _validate(self) -> list[str]:
+        """Check model configuration and that the CLI binary runs."""
+        errors = []
+        if not self.model:
+            errors.append("ANTHROPIC_MODEL is not set")
+        if not os.environ.get("ANTHROPIC_API_KEY"):
+            errors.append("ANTHROPIC_AUTH_TOKEN is not set")
+
+        if self.cli_path is None:
+            errors.append("Claude CLI not found")
+            return errors
+        try:
+            result = subprocess.run(
+                [self.cli_path, "--version"], capture_output=True, text=True, timeout=30
+            )
+        except (OSError, subprocess.TimeoutExpired) as e:
+            errors.append(f"Claude CLI failed to run: {e}")
+        else:
+            if result.returncode != 0:
+                errors.append(f"Claude CLI exited with {result.returncode}: {result.stderr.strip()}")
+        return errors
@@ -0,0 +1,339 @@
+"""Background type-check and lint diagnostics for the session workdir.
+
+Instead of the agent running a cold `tsc` or `npm run build` to find
+compile errors, a long-lived `tsc --noEmit --watch` runs in the workdir and
+ESLint (with its cache) re-lints each file the agent writes. Both start
+lazily on the first Write/Edit the hooks observe.
+
+Fresh results are emitted to the session as `diagnostics` events and handed
+to the agent through the hook layer (see `AgentHooks`).
+"""
+
+import asyncio
+import json
+import logging
+import re
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Literal
+
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+# File extensions ESLint is run on
+LINTABLE_SUFFIXES = {".ts", ".tsx", ".js", ".jsx", ".mjs", ".cjs"}
+# File extensions a write waits for a tsc cycle on (Next's tsconfig only includes these)
+TYPECHECKED_SUFFIXES = {".ts", ".tsx"}
+
+# `app/page.tsx(12,5): error TS2322: Type 'string' is not assignable ...`
+_TSC_DIAGNOSTIC = re.compile(r"^(?P<file>.+?)\((?P<line>\d+),(?P<column>\d+)\): (?P<severity>error|warning) (?P<code>TS\d+): (?P<message>.*)$")
+# `12:00:00 PM - Starting compilation in watch mode...` / `File change detected. Starting incremental compilation...`
+_TSC_CYCLE_START = re.compile(r"Starting (incremental )?compilation")
+# `12:00:01 PM - Found 2 errors. Watching for file changes.`
+_TSC_CYCLE_END = re.compile(r"Found \d+ errors?\. Watching for file changes")
+
+# Seconds to batch writes before running ESLint
+LINT_DEBOUNCE = 0.3
+
+# Seconds after a write within which tsc must start a cycle; otherwise the
+# write didn't affect the program and results count as fresh
+TSC_CYCLE_GRACE = 1.0
+
+
+class Diagnostic(BaseModel):
+    """A single type-check or lint issue (mirrors `AgentIssue` in the frontend)."""
+
+    source: Literal["tsc", "eslint"]
+    file: str
+    line: int | None = None
+    column: int | None = None
+    severity: Literal["error", "warning", "info"]
+    message: str
+    rule_id: str | None = None
+
+    def format(self) -> str:
+        location = f"{self.file}:{self.line}:{self.column}" if self.line else self.file
+        rule = f" ({self.rule_id})" if self.rule_id else ""
+        return f"[{self.severity.upper()}] {location} {self.message}{rule}"
+
+
+class DiagnosticsService:
+    """Runs tsc in watch mode and ESLint on written files for one workdir."""
+
+    def __init__(
+        self,
+        workdir: str,
+        on_update: Callable[[str, list[Diagnostic]], Awaitable[None]],
+    ):
+        self.workdir = Path(workdir)
+        self.on_update = on_update
+        self._tsc_bin = self.workdir / "node_modules" / ".bin" / "tsc"
+        self._eslint_bin = self.workdir / "node_modules" / ".bin" / "eslint"
+
+        self._tsc_process: asyncio.subprocess.Process | None = None
+        self._tsc_reader: asyncio.Task | None = None
+        self._tsc_diagnostics: list[Diagnostic] = []
+        self._tsc_pending: list[Diagnostic] = []
+        self._tsc_cycle_started = 0.0
+        self._tsc_completed = 0.0  # start time of the last completed cycle
+
+        self._lint_diagnostics: dict[str, list[Diagnostic]] = {}
+        self._lint_queue: set[str] = set()
+        self._lint_task: asyncio.Task | None = None
+        self._lint_process: asyncio.subprocess.Process | None = None
+        self._lint_running = False
+
+        self._last_write = 0.0  # last write of a type-checked file
+        self._changed = asyncio.Condition()
+
+    @property
+    def enabled(self) -> bool:
+        """Whether the workdir has the tools installed."""
+        return self._tsc_bin.exists() or self._eslint_bin.exists()
+
+    def current(self) -> list[Diagnostic]:
+        """Latest known diagnostics from both sources."""
+        lint = [d for diagnostics in self._lint_diagnostics.values() for d in diagnostics]
+        return self._tsc_diagnostics + lint
+
+    async def notify_write(self, path: str) -> None:
+        """Record that the agent wrote a file, starting the checkers if needed."""
+        # Other files (styles, docs) are neither linted nor type-checked
+        suffix = Path(path).suffix
+        if suffix not in LINTABLE_SUFFIXES:
+            return
+
+        await self._ensure_tsc()
+        if suffix in TYPECHECKED_SUFFIXES:
+            self._last_write = time.monotonic()
+
+        if self._eslint_bin.exists():
+            self._lint_queue.add(path)
+            self._lint_running = True
+            if self._lint_task is None or self._lint_task.done():
+                self._lint_task = asyncio.create_task(self._run_lint())
+
+    async def wait_fresh(self, timeout: float) -> list[Diagnostic]:
+        """Wait until diagnostics reflect the last write, or timeout.
+
+        Returns whatever is known at that point.
+        """
+        deadline = time.monotonic() + timeout
+        async with self._changed:
+            while not self._is_fresh():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    logger.info(f"Diagnostics not fresh after {timeout}s, returning latest")
+                    break
+                # Wake up at least every grace period: freshness also changes with time
+                try:
+                    await asyncio.wait_for(self._changed.wait(), min(remaining, TSC_CYCLE_GRACE))
+                except asyncio.TimeoutError:
+                    pass
+        return self.current()
+
+    def is_watching(self) -> bool:
+        """Whether tsc is watching, has finished a cycle and its results reflect the last write."""
+        return self._tsc_process is not None and self._tsc_completed > 0 and self._is_fresh()
+
+    def is_pending(self) -> bool:
+        """Whether a check covering the last write is still outstanding."""
+        return not self._is_fresh()
+
+    async def stop(self) -> None:
+        """Stop the tsc watcher and any lint run."""
+        lint_process = self._lint_process  # Cleared by the lint task once cancelled
+        if self._lint_task is not None:
+            self._lint_task.cancel()
+        if self._tsc_reader is not None:
+            self._tsc_reader.cancel()
+        await _terminate(lint_process)
+        await _terminate(self._tsc_process)
+
+    def _is_fresh(self) -> bool:
+        return self._tsc_fresh() and not self._lint_running
+
+    def _tsc_fresh(self) -> bool:
+        """Whether tsc results cover the last write, or no cycle for it is coming."""
+        if self._tsc_process is None:
+            return True
+        if self._tsc_completed == 0:
+            return False  # Still in the initial compile: nothing is known yet
+        if self._tsc_completed >= self._last_write:
+            return True
+        if self._tsc_cycle_started >= self._last_write:
+            return False  # A cycle covering the write is running
+        # No cycle started: the write didn't change anything tsc checks
+        return time.monotonic() - self._last_write >= TSC_CYCLE_GRACE
+
+    async def _ensure_tsc(self) -> None:
+        """Start `tsc --watch` on first use."""
+        if self._tsc_process is not None or not self._tsc_bin.exists():
+            return
+        if not (self.workdir / "tsconfig.json").exists():
+            return
+
+        logger.info(f"Starting tsc watcher in {self.workdir}")
+        self._tsc_cycle_started = time.monotonic()  # The initial compile, until tsc reports it
+        self._tsc_process = await asyncio.create_subprocess_exec(
+            str(self._tsc_bin),
+            "--noEmit",
+            "--watch",
+            "--preserveWatchOutput",
+            "--pretty",
+            "false",
+            cwd=self.workdir,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+        )
+        self._tsc_reader = asyncio.create_task(self._read_tsc())
+
+    async def _read_tsc(self) -> None:
+        """Parse tsc watch output into diagnostics, one compilation cycle at a time."""
+        assert self._tsc_process is not None and self._tsc_process.stdout is not None
+        initial = True
+        async for raw_line in self._tsc_process.stdout:
+            line = raw_line.decode(errors="replace").rstrip()
+            if _TSC_CYCLE_START.search(line):
+                # The initial compile read the files when the watcher was spawned
+                if not initial:
+                    self._tsc_cycle_started = time.monotonic()
+                initial = False
+                self._tsc_pending = []
+            elif _TSC_CYCLE_END.search(line):
+                self._tsc_diagnostics = self._tsc_pending
+                self._tsc_pending = []
+                self._tsc_completed = self._tsc_cycle_started
+                await self._publish("tsc")
+            elif match := _TSC_DIAGNOSTIC.match(line):
+                self._tsc_pending.append(
+                    Diagnostic(
+                        source="tsc",
+                        file=match["file"],
+                        line=int(match["line"]),
+                        column=int(match["column"]),
+                        severity=match["severity"],  # type: ignore[arg-type]
+                        message=match["message"],
+                        rule_id=match["code"],
+                    )
+                )
+            elif line.startswith(" ") and self._tsc_pending:
+                # Continuation of a multi-line message
+                self._tsc_pending[-1].message += "\n" + line.strip()
+
+        logger.info(f"tsc watcher exited in {self.workdir}")
+        self._tsc_process = None
+        async with self._changed:
+            self._changed.notify_all()
+
+    async def _run_lint(self) -> None:
+        """Lint queued files with ESLint's cache, batching writes that arrive together."""
+        try:
+            while self._lint_queue:
+                await asyncio.sleep(LINT_DEBOUNCE)
+                files = sorted(self._lint_queue)
+                self._lint_queue.clear()
+                await self._lint(files)
+                # Writes arriving while publishing keep the loop going
+                self._lint_running = bool(self._lint_queue)
+                await self._publish("eslint")
+        except Exception as e:
+            logger.error(f"ESLint failed in {self.workdir}: {e}", exc_info=True)
+            self._lint_queue.clear()
+            self._lint_running = False
+            await self._publish("eslint")
+        finally:
+            self._lint_running = False
+
+    async def _lint(self, files: list[str]) -> None:
+        """Run ESLint on files and store the results per file."""
+        self._lint_process = process = await asyncio.create_subprocess_exec(
+            str(self._eslint_bin),
+            "--cache",
+            "--cache-location",
+            str(self.workdir / ".next" / "cache" / "eslint"),
+            "--format",
+            "json",
+            *files,
+            cwd=self.workdir,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        try:
+            stdout, _ = await process.communicate()
+        finally:
+            self._lint_process = None
+        try:
+            results = json.loads(stdout or b"[]")
+        except ValueError:
+            logger.warning(f"Unparseable ESLint output for {files}")
+            return
+
+        for result in results:
+            if "filePath" not in result:
+                continue
+            file = self._relative(result["filePath"])
+            self._lint_diagnostics[file] = [
+                Diagnostic(
+                    source="eslint",
+                    file=file,
+                    line=message.get("line"),
+                    column=message.get("column"),
+                    severity="error" if message.get("severity") == 2 else "warning",
+                    message=message.get("message", ""),
+                    rule_id=message.get("ruleId"),
+                )
+                for message in result.get("messages", [])
+            ]
+
+    def _relative(self, path: str) -> str:
+        """Make a path relative to the workdir where possible."""
+        resolved = Path(path)
+        if resolved.is_absolute() and resolved.is_relative_to(self.workdir):
+            return str(resolved.relative_to(self.workdir))
+        return path
+
+    async def _publish(self, source: str) -> None:
+        """Wake waiters and report the new diagnostics."""
+        async with self._changed:
+            self._changed.notify_all()
+
+        try:
+            await self.on_update(source, self.current())
+        except Exception as e:
+            logger.error(f"Failed to publish diagnostics: {e}", exc_info=True)
+
+
+async def _terminate(process: asyncio.subprocess.Process | None) -> None:
+    """Terminate a checker process, killing it if it doesn't exit in time."""
+    if process is None or process.returncode is not None:
+        return
+    process.terminate()
+    try:
+        await asyncio.wait_for(process.wait(), 5)
+    except asyncio.TimeoutError:
+        process.kill()
+
+
+def format_diagnostics(diagnostics: list[Diagnostic], pending: bool = False, limit: int = 30) -> str:
+    """Format diagnostics as context for the agent.
+
+    With pending, the checks haven't caught up with the latest changes, so
+    an empty list is not reported as "no errors".
+    """
+    errors = [d for d in diagnostics if d.severity == "error"]
+    warnings = [d for d in diagnostics if d.severity != "error"]
+    if pending:
+        header = "Type-check pending: results for the latest changes are not available yet."
+        if not diagnostics:
+            return header
+        lines = [f"{header} Last known: {len(errors)} errors, {len(warnings)} warnings."]
+    elif not diagnostics:
+        return "Type-check and lint: no errors."
+    else:
+        lines = [f"Type-check and lint: {len(errors)} errors, {len(warnings)} warnings."]
+    lines += [d.format() for d in (errors + warnings)[:limit]]
+    if len(diagnostics) > limit:
+        lines.append(f"... and {len(diagnostics) - limit} more")
+    return "\n".join(lines)
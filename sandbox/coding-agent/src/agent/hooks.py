@@ -5,16 +5,28 @@ Hook events are separate from message content blocks - they capture the executio
 aspect (before/after with timing), while content blocks capture the data aspect.
 """
 
+import os
+import re
 import time
 from typing import TYPE_CHECKING
 
 from claude_agent_sdk import HookContext, HookInput, HookJSONOutput
 
-from ..models.events import AgentEvent, EventType
+from ..models.events import AgentEvent, EventType, is_tool_error
+from .diagnostics import DiagnosticsService, format_diagnostics
 
 if TYPE_CHECKING:
     from ..main import Session
 
+# Tools that write files the diagnostics service should check
+WRITE_TOOLS = {"Write", "Edit", "MultiEdit"}
+
+# Bash commands that only type-check, answered from the tsc watcher instead
+TYPECHECK_COMMAND = re.compile(r"^\s*(npx\s+)?tsc\b[^|;&]*--noEmit[^|;&]*$")
+
+# Seconds a write waits for fresh diagnostics before returning
+DIAGNOSTICS_WAIT = float(os.environ.get("DIAGNOSTICS_WAIT_SECONDS", "5"))
+
 
 class AgentHooks:
     """Claude Agent event hooks for streaming via SSE.
@@ -22,11 +34,21 @@ class AgentHooks:
     Emits events for:
     - PreToolUse: Before tool execution (with input)
     - PostToolUse: After tool execution (with output and duration)
+
+    With a diagnostics service, Write/Edit results get fresh type-check and
+    lint diagnostics attached as additional context, and standalone
+    `tsc --noEmit` commands are answered from the watcher.
     """
 
-    def __init__(self, session: "Session", workdir: str):
+    def __init__(
+        self,
+        session: "Session",
+        workdir: str,
+        diagnostics: DiagnosticsService | None = None,
+    ):
         self.session = session
         self.workdir = workdir
+        self.diagnostics = diagnostics
         self.tool_start_time: dict[str, float] = {}
 
     async def on_pre_tool_use(
@@ -56,6 +78,9 @@ class AgentHooks:
         )
         await self.session.add_event(event)
 
+        if tool_name == "Bash" and self._is_typecheck(tool_input):
+            return self._answer_typecheck()
+
         return {}
 
     async def on_post_tool_use(
@@ -88,8 +113,46 @@ class AgentHooks:
         )
         await self.session.add_event(event)
 
+        # A failed write changed nothing, so there is nothing new to check
+        if tool_name in WRITE_TOOLS and self.diagnostics is not None and not is_tool_error(tool_response):
+            return await self._attach_diagnostics(tool_input.get("file_path", ""))
+
         return {}
 
+    async def _attach_diagnostics(self, file_path: str) -> HookJSONOutput:
+        """Wait for diagnostics covering a write and hand them to the agent."""
+        assert self.diagnostics is not None
+        await self.diagnostics.notify_write(file_path)
+        diagnostics = await self.diagnostics.wait_fresh(DIAGNOSTICS_WAIT)
+        return {
+            "hookSpecificOutput": {
+                "hookEventName": "PostToolUse",
+                "additionalContext": format_diagnostics(
+                    diagnostics, pending=self.diagnostics.is_pending()
+                ),
+            }
+        }
+
+    def _is_typecheck(self, tool_input: dict) -> bool:
+        """Whether a Bash command is a type-check the watcher can answer."""
+        return (
+            self.diagnostics is not None
+            and self.diagnostics.is_watching()
+            and bool(TYPECHECK_COMMAND.match(str(tool_input.get("command", ""))))
+        )
+
+    def _answer_typecheck(self) -> HookJSONOutput:
+        """Deny a cold type-check, returning the watcher's current result instead."""
+        assert self.diagnostics is not None
+        result = format_diagnostics(self.diagnostics.current())
+        return {
+            "hookSpecificOutput": {
+                "hookEventName": "PreToolUse",
+                "permissionDecision": "deny",
+                "permissionDecisionReason": f"Answered by the background tsc watcher. {result}",
+            }
+        }
+
     async def on_error(self, error: Exception) -> None:
         """Hook called when an error occurs."""
         event = AgentEvent(
@@ -1,10 +1,10 @@
 """Claude Agent runner for executing coding tasks."""
 
+import asyncio
 import logging
 import os
 import sys
 import time
-from pathlib import Path
 from typing import TYPE_CHECKING, Any
 
 from claude_agent_sdk import (
@@ -20,6 +20,9 @@ from claude_agent_sdk import (
     ToolUseBlock,
 )
 
+from .admission import list_descendants, renice
+from .config import AgentConfig
+from .diagnostics import Diagnostic, DiagnosticsService
 from .hooks import AgentHooks
 from ..models.events import AgentEvent, EventType
 
@@ -30,27 +33,12 @@ if TYPE_CHECKING:
 class AgentRunner:
     """Claude Agent runner for Next.js coding tasks."""
 
-    def __init__(self, workdir: str, session: "Session"):
+    def __init__(self, workdir: str, session: "Session", config: AgentConfig, niceness: int = 0):
         self.workdir = workdir
         self.session = session
-        self.system_prompt = self._load_system_prompt()
-
-        self._configure_api()
-
-    def _configure_api(self) -> None:
-        """Configure Anthropic API environment variables."""
-        os.environ["ANTHROPIC_BASE_URL"] = os.environ.get(
-            "ANTHROPIC_BASE_URL", "https://api.novita.ai/anthropic"
-        )
-        os.environ["ANTHROPIC_API_KEY"] = os.environ.get("ANTHROPIC_AUTH_TOKEN", "")
-        os.environ["ANTHROPIC_MODEL"] = os.environ.get(
-            "ANTHROPIC_MODEL", ""
-        )
-
-    def _load_system_prompt(self) -> str:
-        """Load system prompt from file."""
-        prompt_file = Path(__file__).parent / "prompts" / "system_prompt.txt"
-        return prompt_file.read_text()
+        self.config = config
+        self.system_prompt = config.system_prompt
+        self.niceness = niceness
 
     async def run(self, user_prompt: str) -> None:
         """Run Agent and store events to session."""
@@ -59,34 +47,85 @@ class AgentRunner:
         # Send started event
         await self._emit_event(self._create_started_event(user_prompt))
 
-        hooks = AgentHooks(self.session, self.workdir)
+        diagnostics = self._create_diagnostics()
+        hooks = AgentHooks(self.session, self.workdir, diagnostics=diagnostics)
         options = self._create_agent_options(hooks)
+        existing_pids = await asyncio.to_thread(list_descendants, os.getpid()) if self.niceness else set()
 
         try:
             async with ClaudeSDKClient(options=options) as client:
+                if self.niceness:
+                    await self._lower_priority(existing_pids)
+
                 # Send the query
                 await client.query(user_prompt)
-
-                # Process all messages from Claude
-                async for msg in client.receive_response():
-                    # Then process the message based on its type
-                    if isinstance(msg, AssistantMessage):
-                        await self._process_assistant_message(msg)
-                    elif isinstance(msg, ResultMessage):
-                        await self._emit_event(self._create_result_event(msg))
-                    elif isinstance(msg, SystemMessage):
-                        await self._emit_event(self._create_system_event(msg))
+                self.session.accepting_follow_ups = True
+
+                while True:
+                    # Process all messages from Claude
+                    async for msg in client.receive_response():
+                        # Then process the message based on its type
+                        if isinstance(msg, AssistantMessage):
+                            await self._process_assistant_message(msg)
+                        elif isinstance(msg, ResultMessage):
+                            await self._emit_event(self._create_result_event(msg))
+                        elif isinstance(msg, SystemMessage):
+                            await self._emit_event(self._create_system_event(msg))
+
+                    # Continue the conversation with follow-ups queued meanwhile
+                    try:
+                        follow_up = self.session.follow_ups.get_nowait()
+                    except asyncio.QueueEmpty:
+                        self.session.accepting_follow_ups = False
+                        break
+                    await self._emit_event(self._create_user_prompt_event(follow_up))
+                    await client.query(follow_up)
 
         except Exception as e:
             logging.error(f"Agent execution error: {type(e).__name__}: {str(e)}", exc_info=True)
             await hooks.on_error(e)
             await self._emit_event(self._create_error_event(e))
             raise
+        finally:
+            self.session.accepting_follow_ups = False
+            if diagnostics is not None:
+                await diagnostics.stop()
 
         duration = time.time() - start_time
         logging.info(f"Agent completed in {duration:.2f}s")
         await self._emit_event(self._create_completed_event(duration))
 
+    def _create_diagnostics(self) -> DiagnosticsService | None:
+        """Create the background type-check/lint service unless disabled."""
+        if os.environ.get("DIAGNOSTICS_ENABLED", "1") == "0":
+            return None
+        service = DiagnosticsService(self.workdir, on_update=self._emit_diagnostics)
+        return service if service.enabled else None
+
+    async def _emit_diagnostics(self, source: str, diagnostics: list[Diagnostic]) -> None:
+        """Emit fresh diagnostics to the session."""
+        await self._emit_event(
+            AgentEvent(
+                type=EventType.DIAGNOSTICS,
+                timestamp=time.time(),
+                data={
+                    "source": source,
+                    "error_count": sum(d.severity == "error" for d in diagnostics),
+                    "warning_count": sum(d.severity == "warning" for d in diagnostics),
+                    "diagnostics": [d.model_dump() for d in diagnostics],
+                },
+            )
+        )
+
+    async def _lower_priority(self, existing_pids: set[int]) -> None:
+        """Renice the agent CLI processes started by this run.
+
+        Tools the CLI spawns later inherit its niceness.
+        """
+        new_pids = await asyncio.to_thread(list_descendants, os.getpid()) - existing_pids
+        renice(new_pids, self.niceness)
+        logging.info(f"Agent processes {sorted(new_pids)} reniced to {self.niceness}")
+
     async def _emit_event(self, event: AgentEvent) -> None:
         """Emit event to session."""
         await self.session.add_event(event)
@@ -97,28 +136,24 @@ class AgentRunner:
             type=EventType.STARTED,
             timestamp=time.time(),
             data={
-                "model": os.environ.get("ANTHROPIC_MODEL", "unknown"),
+                "model": self.config.model or "unknown",
                 "prompt": user_prompt,
                 "workdir": self.workdir,
             },
         )
 
+    def _create_user_prompt_event(self, prompt: str) -> AgentEvent:
+        """Create an event for a follow-up prompt sent during the run."""
+        return AgentEvent(
+            type=EventType.USER_PROMPT,
+            timestamp=time.time(),
+            data={"prompt": prompt},
+        )
+
     def _create_agent_options(self, hooks: AgentHooks) -> ClaudeAgentOptions:
-        """Create Claude Agent options."""
-        return ClaudeAgentOptions(
-            resume=None,
-            system_prompt=self.system_prompt,
-            cwd=self.workdir,
-            setting_sources=["project"],
-            allowed_tools=[
-                "Read",
-                "Write",
-                "Edit",
-                "Bash",
-                "Glob",
-                "Grep",
-            ],
-            permission_mode="bypassPermissions",
+        """Create Claude Agent options from the preloaded template."""
+        return self.config.create_options(
+            self.workdir,
             hooks={
                 "PreToolUse": [HookMatcher(matcher=None, hooks=[hooks.on_pre_tool_use])],
                 "PostToolUse": [HookMatcher(matcher=None, hooks=[hooks.on_post_tool_use])],
@@ -0,0 +1,253 @@
+"""Copy-on-write session workdirs.
+
+The pristine Next.js template baked into the sandbox image is snapshotted
+once, and each new session gets its own workdir cloned from that snapshot:
+
+- Source files are reflinked (copy-on-write) where the filesystem supports
+  it and copied otherwise. They are never hardlinked, since tools edit
+  files in place and would otherwise modify every clone at once.
+- ``node_modules`` is hardlinked file by file, so every clone shares the
+  same installed packages without copying them.
+- ``.next`` build output is skipped.
+
+One spare clone is kept ready so a fresh session only needs a rename.
+Finished sessions are snapshotted the same way and can be rolled back to.
+
+Layout on disk::
+
+    <root>/
+    ├── template/               # pristine template snapshot
+    ├── spare/                  # pre-cloned workdir for the next session
+    ├── sessions/<session_id>/  # live session workdirs
+    └── snapshots/<session_id>/ # finished session snapshots
+
+All methods are blocking filesystem work; call them via ``asyncio.to_thread``.
+"""
+
+import errno
+import fcntl
+import logging
+import os
+import shutil
+import threading
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Directories shared between clones via hardlinks
+SHARED_DIRS = {"node_modules"}
+
+# Directories never cloned (build output, regenerated on demand)
+SKIPPED_DIRS = {".next", ".turbo"}
+
+# ioctl request for cloning a file's extents (linux/fs.h)
+FICLONE = 0x40049409
+
+DEFAULT_TEMPLATE_DIR = "/home/user/app"
+DEFAULT_WORKSPACE_ROOT = Path.home() / "workspaces"
+DEFAULT_MAX_SESSIONS = 3
+DEFAULT_MAX_SNAPSHOTS = 10
+
+
+class WorkspaceError(Exception):
+    """Raised when a workdir cannot be created or restored."""
+
+
+class WorkspaceManager:
+    """Creates per-session workdirs from a pristine template snapshot."""
+
+    def __init__(
+        self,
+        template_dir: str = DEFAULT_TEMPLATE_DIR,
+        root: Path = DEFAULT_WORKSPACE_ROOT,
+        max_sessions: int = DEFAULT_MAX_SESSIONS,
+        max_snapshots: int = DEFAULT_MAX_SNAPSHOTS,
+    ):
+        self.template_dir = Path(template_dir)
+        self.root = root
+        self.max_sessions = max_sessions
+        self.max_snapshots = max_snapshots
+        self._lock = threading.Lock()
+        self._reflink_supported = True
+
+    @classmethod
+    def from_env(cls) -> "WorkspaceManager":
+        """Create a manager configured from environment variables."""
+        return cls(
+            template_dir=os.environ.get("WORKSPACE_TEMPLATE_DIR", DEFAULT_TEMPLATE_DIR),
+            root=Path(os.environ.get("WORKSPACE_ROOT", str(DEFAULT_WORKSPACE_ROOT))),
+            max_sessions=int(os.environ.get("WORKSPACE_MAX_SESSIONS", DEFAULT_MAX_SESSIONS)),
+            max_snapshots=int(os.environ.get("WORKSPACE_MAX_SNAPSHOTS", DEFAULT_MAX_SNAPSHOTS)),
+        )
+
+    @property
+    def template_snapshot(self) -> Path:
+        return self.root / "template"
+
+    @property
+    def spare_dir(self) -> Path:
+        return self.root / "spare"
+
+    def session_dir(self, session_id: str) -> Path:
+        return self.root / "sessions" / session_id
+
+    def snapshot_dir(self, session_id: str) -> Path:
+        return self.root / "snapshots" / session_id
+
+    def has_snapshot(self, session_id: str) -> bool:
+        """Whether a finished session snapshot exists."""
+        return self.snapshot_dir(session_id).is_dir()
+
+    def prepare(self) -> None:
+        """Snapshot the pristine template (once) and make sure a spare clone is ready."""
+        with self._lock:
+            self._ensure_template()
+            self._ensure_spare()
+
+    def create(self, session_id: str, base_session: str | None = None) -> str:
+        """Create a workdir for a session.
+
+        Starts from the pristine template, or from the snapshot of
+        base_session if given. Returns the workdir path.
+        """
+        with self._lock:
+            target = self.session_dir(session_id)
+            if base_session is not None:
+                source = self.snapshot_dir(base_session)
+                if not source.is_dir():
+                    raise WorkspaceError(f"No snapshot for session: {base_session}")
+                self._clone_tree(source, target)
+            else:
+                self._ensure_template()
+                if self.spare_dir.is_dir():
+                    target.parent.mkdir(parents=True, exist_ok=True)
+                    self.spare_dir.rename(target)
+                else:
+                    self._clone_tree(self.template_snapshot, target)
+
+            self._prune(self.root / "sessions", self.max_sessions, keep=session_id)
+
+        logger.info(f"Created workdir for session {session_id}: {target}")
+        return str(target)
+
+    def snapshot(self, session_id: str, workdir: str) -> None:
+        """Snapshot a finished session's workdir for later rollback."""
+        with self._lock:
+            target = self.snapshot_dir(session_id)
+            shutil.rmtree(target, ignore_errors=True)
+            self._clone_tree(Path(workdir), target)
+            self._prune(self.root / "snapshots", self.max_snapshots, keep=session_id)
+
+        logger.info(f"Snapshotted session {session_id} from {workdir}")
+
+    def rollback(self, session_id: str, workdir: str) -> None:
+        """Reset a workdir to the snapshot of a finished session.
+
+        node_modules in the workdir is left in place. A workdir that has been
+        pruned since is recreated from the snapshot.
+        """
+        with self._lock:
+            source = self.snapshot_dir(session_id)
+            if not source.is_dir():
+                raise WorkspaceError(f"No snapshot for session: {session_id}")
+
+            root = Path(workdir)
+            if not root.is_dir():
+                self._clone_tree(source, root)
+            else:
+                for child in root.iterdir():
+                    if child.name in SHARED_DIRS:
+                        continue
+                    if child.is_dir() and not child.is_symlink():
+                        shutil.rmtree(child)
+                    else:
+                        child.unlink()
+                self._clone_tree(source, root, skip=SHARED_DIRS)
+
+        logger.info(f"Rolled back {workdir} to snapshot of session {session_id}")
+
+    def _ensure_template(self) -> None:
+        """Snapshot the template directory if not done yet."""
+        if self.template_snapshot.is_dir():
+            return
+        if not self.template_dir.is_dir():
+            raise WorkspaceError(f"Template directory does not exist: {self.template_dir}")
+
+        logger.info(f"Snapshotting template {self.template_dir}")
+        partial = self.root / "template.partial"
+        shutil.rmtree(partial, ignore_errors=True)
+        self._clone_tree(self.template_dir, partial)
+        partial.rename(self.template_snapshot)
+
+    def _ensure_spare(self) -> None:
+        """Pre-clone a workdir from the template snapshot if none is ready."""
+        if self.spare_dir.is_dir():
+            return
+        partial = self.root / "spare.partial"
+        shutil.rmtree(partial, ignore_errors=True)
+        self._clone_tree(self.template_snapshot, partial)
+        partial.rename(self.spare_dir)
+
+    def _prune(self, parent: Path, limit: int, keep: str) -> None:
+        """Remove the oldest directories under parent beyond limit."""
+        if not parent.is_dir():
+            return
+        entries = sorted(
+            (entry for entry in parent.iterdir() if entry.name != keep),
+            key=lambda entry: entry.stat().st_mtime,
+        )
+        for entry in entries[: max(len(entries) - (limit - 1), 0)]:
+            logger.info(f"Removing old workdir {entry}")
+            shutil.rmtree(entry, ignore_errors=True)
+
+    def _clone_tree(self, source: Path, target: Path, skip: frozenset[str] | set[str] = frozenset()) -> None:
+        """Clone source into target, hardlinking shared dirs and reflinking the rest."""
+        for dirpath, dirnames, filenames in os.walk(source):
+            current = Path(dirpath)
+            rel = current.relative_to(source)
+            shared = any(part in SHARED_DIRS for part in rel.parts)
+            (target / rel).mkdir(parents=True, exist_ok=True)
+
+            kept = []
+            for name in dirnames:
+                if name in SKIPPED_DIRS or (rel == Path(".") and name in skip):
+                    continue
+                if (current / name).is_symlink():
+                    filenames.append(name)
+                else:
+                    kept.append(name)
+            dirnames[:] = kept
+
+            for name in filenames:
+                src = current / name
+                dst = target / rel / name
+                if src.is_symlink():
+                    os.symlink(os.readlink(src), dst)
+                elif shared:
+                    self._link_file(src, dst)
+                else:
+                    self._reflink_file(src, dst)
+
+    def _link_file(self, src: Path, dst: Path) -> None:
+        """Hardlink a file, copying across filesystems."""
+        try:
+            os.link(src, dst)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            shutil.copy2(src, dst)
+
+    def _reflink_file(self, src: Path, dst: Path) -> None:
+        """Reflink a file, copying when the filesystem can't."""
+        if self._reflink_supported:
+            try:
+                with open(src, "rb") as src_file, open(dst, "wb") as dst_file:
+                    fcntl.ioctl(dst_file.fileno(), FICLONE, src_file.fileno())
+                shutil.copystat(src, dst)
+                return
+            except OSError as e:
+                if e.errno not in (errno.EOPNOTSUPP, errno.EXDEV, errno.EINVAL, errno.ENOTTY):
+                    raise
+                logger.info(f"Reflink not supported ({e.strerror}), falling back to copies")
+                self._reflink_supported = False
+        shutil.copy2(src, dst)
@@ -1,6 +1,11 @@
-"""FastAPI server for Coding Agent with SSE streaming."""
+"""FastAPI server for Coding Agent with SSE streaming.
+
+The Claude Agent SDK is imported lazily (see `src.agent.config`), so the
+server starts accepting requests before the SDK and CLI are warmed up.
+"""
 
 import asyncio
+import hmac
 import logging
 import os
 import socket
@@ -9,18 +14,26 @@ import sys
 import time
 import uuid
 from contextlib import asynccontextmanager
-from typing import Literal
+from typing import TYPE_CHECKING, Literal
 
-import uvicorn
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, Header, HTTPException, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import Response, StreamingResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from pydantic import BaseModel
 
-from src.agent.runner import AgentRunner
+from src.agent.admission import AdmissionController, AdmissionDecision, AdmissionThresholds, OverloadedError, read_load
+from src.agent.cache import CacheEntry, GenerationCache, hash_tree, make_cache_key, rebase_paths, snapshot_tree
+from src.agent.config import AgentConfig
+from src.agent.workspace import WorkspaceError, WorkspaceManager
 from src.models.events import AgentEvent, EventType
+from src.models.summary import SessionSummary
+from src.monitoring import profiler
+from src.monitoring.loop import LoopMonitor
+from src.transport.websocket import DEFAULT_WINDOW, EventSocket
 
+if TYPE_CHECKING:
+    from src.agent.runner import AgentRunner
 
 load_dotenv(override=False)
 
@@ -38,20 +51,70 @@ logger = logging.getLogger(__name__)
 class Session:
     """Represents a single agent generation session."""
 
-    def __init__(self, prompt: str, workdir: str):
+    def __init__(
+        self,
+        prompt: str,
+        workdir: str,
+        use_cache: bool = False,
+        bypass_cache: bool = False,
+        replay_speed: float = 0.0,
+    ):
         self.id = f"sess-{uuid.uuid4().hex[:12]}"
         self.prompt = prompt
         self.workdir = workdir
+        self.use_cache = use_cache
+        self.bypass_cache = bypass_cache
+        self.replay_speed = replay_speed
+        self.admission: AdmissionDecision | None = None
+        self.own_workdir = False  # Workdir cloned for this session (fresh/base_session)
         self.status: Literal["running", "completed", "error"] = "running"
         self.created_at = time.time()
         self.events: list[AgentEvent] = []
+        self.summary = SessionSummary(session_id=self.id)
+        self.follow_ups: asyncio.Queue[str] = asyncio.Queue()
+        self.accepting_follow_ups = False  # Set by the runner while its client is connected
         self._task: asyncio.Task | None = None
+        self._cancellable = True  # Cleared once the run ends, before cleanup
         self._lock = asyncio.Lock()
+        self._new_event = asyncio.Event()
 
     async def add_event(self, event: AgentEvent) -> None:
-        """Thread-safe event addition."""
+        """Thread-safe event addition, keeping the running summary up to date."""
         async with self._lock:
             self.events.append(event)
+            self.summary.apply(event)
+            # Wake waiters, then arm a fresh event for the next addition
+            self._new_event.set()
+            self._new_event = asyncio.Event()
+
+    async def wait_for_events(self, index: int, timeout: float) -> None:
+        """Wait until there are more than `index` events, or timeout."""
+        if len(self.events) > index:
+            return
+        try:
+            await asyncio.wait_for(self._new_event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def add_follow_up(self, prompt: str) -> bool:
+        """Queue a follow-up prompt for the running agent; False if it can't take one."""
+        if self.status != "running" or not self.accepting_follow_ups:
+            return False
+        self.follow_ups.put_nowait(prompt)
+        return True
+
+    def cancel(self) -> bool:
+        """Cancel the running generation; False if nothing is running."""
+        if not self._cancellable or self._task is None or self._task.done():
+            return False
+        self._task.cancel()
+        return True
+
+    def get_summary(self) -> SessionSummary:
+        """Get a snapshot of the running summary."""
+        summary = self.summary.model_copy(deep=True)
+        summary.status = self.status
+        return summary
 
     def get_events_copy(self) -> list[AgentEvent]:
         """Get a copy of all events for replay."""
@@ -71,8 +134,75 @@ class Session:
 _active_session: Session | None = None
 _session_lock = asyncio.Lock()
 
+# Recent sessions by id: the running one plus the last SESSION_HISTORY finished ones
+_sessions: dict[str, Session] = {}
+SESSION_HISTORY = int(os.environ.get("SESSION_HISTORY", "10"))
+
+# Final summaries of sessions evicted from _sessions (events are dropped)
+_session_summaries: dict[str, SessionSummary] = {}
+MAX_SESSION_SUMMARIES = 1000
+
+# Recorded generations, created on first use
+_generation_cache: GenerationCache | None = None
+
+
+def get_generation_cache() -> GenerationCache:
+    """Get the generation cache, creating it on first use."""
+    global _generation_cache
+    if _generation_cache is None:
+        _generation_cache = GenerationCache.from_env()
+    return _generation_cache
+
+
+# Load-based admission control for new generations
+_admission = AdmissionController(AdmissionThresholds.from_env())
+
+# Copy-on-write session workdirs
+_workspaces = WorkspaceManager.from_env()
+
+
+_prepare_task: asyncio.Task | None = None
+
+
+async def prepare_workspaces() -> None:
+    """Snapshot the template and pre-clone a spare workdir."""
+    try:
+        await asyncio.to_thread(_workspaces.prepare)
+    except (WorkspaceError, OSError) as e:
+        logger.warning(f"Workspace preparation failed: {e}")
+
+
+def template_snapshot_pending() -> bool:
+    """Whether the startup snapshot of the pristine template is still being taken."""
+    return (
+        _prepare_task is not None
+        and not _prepare_task.done()
+        and not _workspaces.template_snapshot.is_dir()
+    )
 
-async def get_or_create_session(prompt: str, workdir: str) -> Session:
+
+def schedule_prepare_workspaces() -> None:
+    """Run prepare_workspaces in the background unless it is already running."""
+    global _prepare_task
+    if _prepare_task is None or _prepare_task.done():
+        _prepare_task = asyncio.create_task(prepare_workspaces())
+
+
+async def snapshot_workdir(session: Session) -> None:
+    """Keep a snapshot of a finished session's own workdir for rollback.
+
+    Sessions in the shared workdir are not snapshotted, so the default path
+    doesn't pay for cloning node_modules before it completes.
+    """
+    if not session.own_workdir:
+        return
+    try:
+        await asyncio.to_thread(_workspaces.snapshot, session.id, session.workdir)
+    except OSError as e:
+        logger.warning(f"Failed to snapshot workdir of session {session.id}: {e}")
+
+
+async def get_or_create_session(prompt: str, workdir: str, **options) -> Session:
     """Get existing running session or create a new one."""
     global _active_session
 
@@ -84,11 +214,34 @@ async def get_or_create_session(prompt: str, workdir: str) -> Session:
 
         # Create new session
         logger.info("Creating new session")
-        session = Session(prompt=prompt, workdir=workdir)
+        session = Session(prompt=prompt, workdir=workdir, **options)
         _active_session = session
+        _sessions[session.id] = session
+        evict_finished_sessions()
         return session
 
 
+def evict_finished_sessions() -> None:
+    """Drop the oldest finished sessions beyond SESSION_HISTORY, keeping their summaries."""
+    finished = [session for session in _sessions.values() if session.status != "running"]
+    for session in finished[: max(len(finished) - SESSION_HISTORY, 0)]:
+        del _sessions[session.id]
+        _session_summaries[session.id] = session.get_summary()
+        logger.info(f"Evicted finished session {session.id}")
+
+    # Dicts keep insertion order, so the first keys are the oldest
+    for session_id in list(_session_summaries)[: max(len(_session_summaries) - MAX_SESSION_SUMMARIES, 0)]:
+        del _session_summaries[session_id]
+
+
+def get_session(session_id: str) -> Session:
+    """Look up a session by id or raise 404."""
+    session = _sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail=f"Session not found: {session_id}")
+    return session
+
+
 # ========== Request/Response Models ==========
 
 
@@ -97,12 +250,19 @@ class GenerateRequest(BaseModel):
 
     prompt: str
     workdir: str = "/project"
+    use_cache: bool = False  # Opt in to the generation cache
+    bypass_cache: bool = False  # Skip cache lookup but still record the result
+    replay_speed: float = 0.0  # Cache hit replay speed (0 = instant, 1 = recorded pace)
+    fresh: bool = False  # Run in a new workdir cloned from the pristine template
+    base_session: str | None = None  # Run in a new workdir cloned from this session's snapshot
 
 
 class GenerateResponse(BaseModel):
     """Response model for /generate endpoint."""
 
     success: bool
+    session_id: str | None = None
+    workdir: str | None = None
 
 
 class DeployResponse(BaseModel):
@@ -111,15 +271,56 @@ class DeployResponse(BaseModel):
     vercelUrl: str
 
 
+# Event loop lag and slow callback monitoring
+_loop_monitor = LoopMonitor(
+    interval=float(os.environ.get("LOOP_MONITOR_INTERVAL_MS", "100")) / 1000,
+    slow_threshold=float(os.environ.get("LOOP_SLOW_THRESHOLD_MS", "250")) / 1000,
+)
+_profile_lock = asyncio.Lock()
+
+
+# Agent configuration, loaded in lifespan and warmed up in the background
+_agent_config: AgentConfig | None = None
+_warmup_task: asyncio.Task | None = None
+
+
+async def warm_up_agent(config: AgentConfig) -> None:
+    """Import the SDK, build the options template and validate the CLI."""
+    try:
+        await asyncio.to_thread(config.warm_up)
+    except Exception as e:
+        logger.error(f"Agent warm-up error: {e}", exc_info=True)
+        config.errors.append(f"Warm-up error: {e}")
+
+
+async def get_agent_config() -> AgentConfig:
+    """Get the agent configuration once warm-up has finished."""
+    assert _agent_config is not None and _warmup_task is not None
+    await asyncio.shield(_warmup_task)
+    return _agent_config
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan manager."""
-    model = os.getenv("ANTHROPIC_MODEL")
-    base_url = os.getenv("ANTHROPIC_BASE_URL")
+    global _agent_config, _warmup_task
+
+    process_age_ms = _process_age_ms()
+    _agent_config = AgentConfig()
+    if process_age_ms is not None:
+        # Interpreter start, uvicorn and app imports
+        _agent_config.timings_ms = {"process_start": process_age_ms, **_agent_config.timings_ms}
+    _warmup_task = asyncio.create_task(warm_up_agent(_agent_config))
+    _loop_monitor.start()
 
     logger.info("Coding Agent Server starting...")
-    logger.info(f"Configuration - Model: {model}, Base URL: {base_url}")
+    logger.info(
+        f"Configuration - Model: {_agent_config.model}, Base URL: {_agent_config.base_url}"
+    )
+    if _workspaces.template_dir.is_dir():
+        schedule_prepare_workspaces()
     yield
+    await _loop_monitor.stop()
     logger.info("Coding Agent Server shutting down...")
 
 
@@ -174,12 +375,83 @@ async def root():
         "endpoints": {
             "POST /generate": "Start code generation (returns success)",
             "GET /stream": "SSE stream of generation events",
+            "WS /ws": "Event stream with cancel/follow-up/filter control (msgpack or JSON)",
+            "GET /sessions/{id}/summary": "Running summary of a session",
+            "POST /sessions/{id}/rollback": "Reset a session's workdir to its finished snapshot",
+            "GET /sessions/{id}/summary/stream": "SSE stream of periodic summary events",
             "GET /health": "Health check",
+            "GET /ready": "Readiness probe (agent warmed up and validated)",
+            "GET /admission": "Load and admission control decisions",
+            "GET /admin/loop": "Event loop lag and slow callbacks",
+            "POST /admin/profile": "Sampling profile as collapsed stacks",
             "POST /deploy": "Deploy to Vercel",
         },
     }
 
 
+@app.get("/ready")
+async def ready():
+    """Readiness probe.
+
+    Returns 200 once the CLI binary and model configuration have been
+    validated, the SDK is warmed up and the pristine template has been
+    snapshotted, 503 until then (or if validation failed).
+    """
+    if _agent_config is None:
+        raise HTTPException(status_code=503, detail="Server is starting")
+    status = _agent_config.status()
+    status["template_snapshot_pending"] = template_snapshot_pending()
+    status["ready"] = status["ready"] and not status["template_snapshot_pending"]
+    if not status["ready"]:
+        return JSONResponse(status_code=503, content=status)
+    return status
+
+
+@app.get("/admission")
+async def admission_status():
+    """Current load, thresholds and recent admission decisions."""
+    load = await asyncio.to_thread(read_load)
+    return {"load": load.model_dump(), **_admission.status()}
+
+
+def require_admin(authorization: str | None = Header(default=None)) -> None:
+    """Check the bearer token for admin endpoints, which are disabled unless ADMIN_TOKEN is set."""
+    token = os.environ.get("ADMIN_TOKEN")
+    if not token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not hmac.compare_digest(authorization or "", f"Bearer {token}"):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+@app.get("/admin/loop", dependencies=[Depends(require_admin)])
+async def loop_stats():
+    """Event loop lag statistics and recent slow callbacks with stacks."""
+    return _loop_monitor.stats()
+
+
+@app.post("/admin/profile", dependencies=[Depends(require_admin)])
+async def profile(seconds: float = 10.0, hz: int = 100):
+    """Sample all server threads for a while and return collapsed stacks.
+
+    The output can be fed to flamegraph.pl, speedscope or inferno.
+    Sampling runs in a thread, so the event loop keeps serving meanwhile.
+    Only one profile runs at a time.
+    """
+    if _profile_lock.locked():
+        raise HTTPException(status_code=409, detail="A profile is already running")
+
+    async with _profile_lock:
+        logger.info(f"Profiling for {seconds}s at {hz}Hz")
+        collapsed = await asyncio.to_thread(profiler.sample, seconds, hz)
+
+    return PlainTextResponse(
+        collapsed,
+        headers={
+            "Content-Disposition": f'attachment; filename="profile-{int(time.time())}.collapsed"'
+        },
+    )
+
+
 @app.get("/health")
 async def health():
     """Health check endpoint."""
@@ -190,15 +462,32 @@ async def health():
 
 
 async def run_agent_in_background(session: Session) -> None:
-    """Run the agent in background and store events to session."""
-    runner = AgentRunner(workdir=session.workdir, session=session)
+    """Run the agent in background and store events to session.
+
+    Queued sessions first wait for load to drop; throttled sessions run the
+    agent at a lower process priority. With caching enabled, a recorded
+    generation for the same request is restored and replayed instead of
+    running the agent; otherwise a successful run is recorded for next time.
+    """
+    status: Literal["completed", "error"] = "error"
     try:
-        await runner.run(session.prompt)
-        session.status = "completed"
+        from src.agent.runner import AgentRunner
+
+        niceness = await wait_for_admission(session)
+        config = await get_agent_config()
+        runner = AgentRunner(
+            workdir=session.workdir, session=session, config=config, niceness=niceness
+        )
+        if session.use_cache:
+            await run_with_cache(session, runner)
+        else:
+            await runner.run(session.prompt)
+        session._cancellable = False
+        status = "completed"
         logger.info(f"Session {session.id} completed successfully")
     except Exception as e:
+        session._cancellable = False
         logger.error(f"Session {session.id} failed: {e}", exc_info=True)
-        session.status = "error"
         # Add error event
         error_event = AgentEvent(
             type=EventType.ERROR,
@@ -206,6 +495,123 @@ async def run_agent_in_background(session: Session) -> None:
             data={"message": str(e), "type": type(e).__name__},
         )
         await session.add_event(error_event)
+    except asyncio.CancelledError:
+        session._cancellable = False
+        logger.info(f"Session {session.id} cancelled")
+        cancel_event = AgentEvent(
+            type=EventType.ERROR,
+            timestamp=time.time(),
+            data={"message": "Generation cancelled", "type": "CancelledError"},
+        )
+        await session.add_event(cancel_event)
+    finally:
+        session._cancellable = False
+        try:
+            # Snapshot before flipping status so rollback is available once finished
+            await snapshot_workdir(session)
+        finally:
+            session.status = status
+
+
+async def wait_for_admission(session: Session) -> int:
+    """Wait in the admission queue if needed; returns the niceness to run the agent at."""
+    decision = session.admission
+    if decision is None:
+        return 0
+
+    if decision.action == "queue":
+        try:
+            await session.add_event(admission_event(decision))
+            decision = await _admission.wait_for_capacity(decision)
+        finally:
+            _admission.release(session.admission)
+        session.admission = decision
+
+    if decision.action != "admit":
+        await session.add_event(admission_event(decision))
+    if decision.action == "reject":
+        raise OverloadedError(decision)
+    return decision.niceness
+
+
+def admission_event(decision: AdmissionDecision) -> AgentEvent:
+    """Create a system event describing an admission decision."""
+    return AgentEvent(
+        type=EventType.SYSTEM,
+        timestamp=time.time(),
+        data={"subtype": "admission", "data": decision.model_dump()},
+    )
+
+
+async def run_with_cache(session: Session, runner: "AgentRunner") -> None:
+    """Replay a cached generation on hit, or run the agent and record it."""
+    cache = get_generation_cache()
+    before = await asyncio.to_thread(snapshot_tree, session.workdir)
+    key = make_cache_key(
+        prompt=session.prompt,
+        model=runner.config.model,
+        system_prompt=runner.system_prompt,
+        tree_hash=hash_tree(before),
+    )
+
+    if not session.bypass_cache:
+        entry = await asyncio.to_thread(cache.get, key)
+        if entry is not None:
+            try:
+                await asyncio.to_thread(cache.restore, entry, session.workdir)
+            except OSError as e:
+                logger.warning(f"Failed to restore cached generation {key}, running agent: {e}")
+                # The key only holds for the starting tree; don't run or record on top of a partial restore
+                current = await asyncio.to_thread(snapshot_tree, session.workdir)
+                if hash_tree(current) != hash_tree(before):
+                    raise RuntimeError(f"Workdir left modified by a failed cache restore: {e}") from e
+            else:
+                logger.info(f"Session {session.id} replaying cached generation {key}")
+                await replay_cached_events(session, entry)
+                return
+
+    # Record only the run's own events, not admission events added before it
+    first_event = len(session.events)
+    await runner.run(session.prompt)
+
+    events = session.get_events_copy()[first_event:]
+    # Runs steered by follow-up prompts don't depend on the original request alone
+    if any(event.type in (EventType.ERROR, EventType.USER_PROMPT) for event in events):
+        return
+    try:
+        after = await asyncio.to_thread(snapshot_tree, session.workdir)
+        await asyncio.to_thread(cache.put, key, session.workdir, before, after, events)
+    except OSError as e:
+        logger.warning(f"Failed to cache generation {key}: {e}")
+
+
+async def replay_cached_events(session: Session, entry: CacheEntry) -> None:
+    """Re-emit recorded events, keeping their relative timing at the chosen speed.
+
+    Absolute paths under the recorded workdir are rewritten to this session's workdir.
+    """
+    if not entry.events:
+        return
+
+    recorded_workdir = entry.workdir or next(
+        (event.data.get("workdir") for event in entry.events if event.type == EventType.STARTED),
+        None,
+    )
+
+    first_timestamp = entry.events[0].timestamp
+    replay_start = time.time()
+    for event in entry.events:
+        offset = event.timestamp - first_timestamp
+        if session.replay_speed > 0:
+            delay = replay_start + offset / session.replay_speed - time.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        data = dict(event.data)
+        if recorded_workdir:
+            data = rebase_paths(data, recorded_workdir, session.workdir)
+        if event.type == EventType.STARTED:
+            data.update({"workdir": session.workdir, "cache_hit": True})
+        await session.add_event(AgentEvent(type=event.type, timestamp=time.time(), data=data))
 
 
 # ========== API Endpoints ==========
@@ -217,22 +623,83 @@ async def generate(req: GenerateRequest) -> GenerateResponse:
 
     If a session is already running, returns success without creating new session.
     Otherwise, creates a new session and starts generation in background.
+    With `fresh` or `base_session`, the new session gets its own workdir.
     """
     logger.info(f"Received /generate request - Workdir: {req.workdir}")
 
-    if not os.path.exists(req.workdir):
+    own_workdir = req.fresh or req.base_session is not None
+    if req.base_session is not None and not _workspaces.has_snapshot(req.base_session):
+        raise HTTPException(status_code=404, detail=f"No snapshot for session: {req.base_session}")
+    if not own_workdir and not os.path.exists(req.workdir):
         logger.error(f"Invalid workdir: {req.workdir}")
         raise HTTPException(status_code=400, detail=f"Workdir does not exist: {req.workdir}")
 
-    session = await get_or_create_session(req.prompt, req.workdir)
+    # Writes to the template itself must not land in its pristine snapshot
+    if (
+        not own_workdir
+        and template_snapshot_pending()
+        and os.path.realpath(req.workdir) == os.path.realpath(_workspaces.template_dir)
+    ):
+        logger.info("Waiting for the template snapshot before starting")
+        await asyncio.shield(_prepare_task)
+
+    # New generations must pass admission control; joining a running session is free,
+    # unless that session is still queued waiting for load to drop
+    decision = None
+    if _active_session is None or _active_session.status != "running":
+        decision = await _admission.check()
+    elif _active_session.admission is not None and _active_session.admission.action == "queue":
+        queued_check = await _admission.check(_active_session.id, allow_queue=False)
+        if queued_check.action == "reject":
+            decision = queued_check
+    if decision is not None and decision.action == "reject":
+            raise HTTPException(
+                status_code=503,
+                detail=f"Sandbox overloaded: {', '.join(decision.reasons)}",
+                headers={"Retry-After": str(decision.retry_after)},
+            )
 
-    # If this is a new session (no task set), start background task
-    if session._task is None:
-        logger.info(f"Starting background task for session {session.id}")
-        task = asyncio.create_task(run_agent_in_background(session))
-        session.set_task(task)
+    # A queue decision holds a slot until the background task takes it over
+    try:
+        session = await get_or_create_session(
+            req.prompt,
+            req.workdir,
+            use_cache=req.use_cache,
+            bypass_cache=req.bypass_cache,
+            replay_speed=req.replay_speed,
+        )
 
-    return GenerateResponse(success=True)
+        # If this is a new session (no task set), start background task
+        if session._task is None:
+            if decision is not None:
+                decision.session_id = session.id
+                session.admission = decision
+
+            if own_workdir:
+                try:
+                    session.workdir = await asyncio.to_thread(
+                        _workspaces.create, session.id, req.base_session
+                    )
+                except (WorkspaceError, OSError) as e:
+                    logger.error(f"Failed to create workdir for session {session.id}: {e}")
+                    session.status = "error"
+                    raise HTTPException(status_code=500, detail=f"Failed to create workdir: {e}")
+                session.own_workdir = True
+                # Refill the spare clone for the next fresh session
+                schedule_prepare_workspaces()
+
+            logger.info(f"Starting background task for session {session.id}")
+            task = asyncio.create_task(run_agent_in_background(session))
+            session.set_task(task)
+        elif decision is not None:
+            # Another request started a session meanwhile; this one joins it
+            _admission.release(decision)
+    except BaseException:
+        if decision is not None:
+            _admission.release(decision)
+        raise
+
+    return GenerateResponse(success=True, session_id=session.id, workdir=session.workdir)
 
 
 @app.get("/stream")
@@ -279,6 +746,113 @@ async def stream_session():
     )
 
 
+@app.websocket("/ws")
+async def websocket_stream(
+    websocket: WebSocket,
+    session_id: str | None = None,
+    encoding: Literal["msgpack", "json"] = "msgpack",
+    window: int = DEFAULT_WINDOW,
+    filter: str = "all",
+):
+    """WebSocket stream for session events and control messages.
+
+    Streams the given session (default: the active one) like /stream, and
+    accepts ack, cancel, follow_up and filter messages from the client.
+    See `src.transport.websocket` for the protocol.
+    """
+    session = _sessions.get(session_id) if session_id else _active_session
+    if session is None:
+        await websocket.close(code=4404, reason="Session not found")
+        return
+
+    async def start_generation(prompt: str, workdir: str) -> Session:
+        response = await generate(GenerateRequest(prompt=prompt, workdir=workdir))
+        return get_session(response.session_id or "")
+
+    await websocket.accept()
+    await EventSocket(websocket, session, start_generation, encoding, window, filter).serve()
+
+
+@app.post("/sessions/{session_id}/rollback")
+async def rollback_session(session_id: str):
+    """Reset a finished session's workdir to the snapshot taken when it finished."""
+    session = get_session(session_id)
+    if session.status == "running":
+        raise HTTPException(status_code=409, detail="Session is still running")
+    if (
+        _active_session is not None
+        and _active_session.status == "running"
+        and _active_session.workdir == session.workdir
+    ):
+        raise HTTPException(status_code=409, detail="Workdir is in use by a running session")
+
+    try:
+        await asyncio.to_thread(_workspaces.rollback, session.id, session.workdir)
+    except WorkspaceError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except OSError as e:
+        logger.error(f"Failed to roll back session {session.id}: {e}")
+        raise HTTPException(status_code=500, detail=f"Rollback failed: {e}")
+
+    return {"success": True, "workdir": session.workdir}
+
+
+@app.get("/sessions/{session_id}/summary")
+async def session_summary(session_id: str) -> SessionSummary:
+    """Get the running summary of a session.
+
+    The summary is maintained incrementally as events are added,
+    so this is cheap regardless of how long the session has run.
+    Evicted sessions still report their final summary.
+    """
+    if session_id in _session_summaries:
+        return _session_summaries[session_id]
+    return get_session(session_id).get_summary()
+
+
+@app.get("/sessions/{session_id}/summary/stream")
+async def stream_session_summary(session_id: str, interval: float = 1.0):
+    """SSE stream of compact summary events.
+
+    Emits a `summary` event immediately, then every `interval` seconds
+    whenever the summary has changed. Ends with a final summary event
+    once the session is no longer running.
+    """
+    session = get_session(session_id)
+    interval = max(interval, 0.1)
+
+    def summary_frame() -> str:
+        event = AgentEvent(
+            type=EventType.SUMMARY,
+            timestamp=time.time(),
+            data=session.get_summary().model_dump(),
+        )
+        return f"data: {event.model_dump_json()}\n\n"
+
+    async def event_stream():
+        last_count = session.summary.event_count
+        yield summary_frame()
+
+        while session.status == "running":
+            await asyncio.sleep(interval)
+            if session.summary.event_count != last_count:
+                last_count = session.summary.event_count
+                yield summary_frame()
+
+        yield summary_frame()
+        logger.info(f"Summary stream ended for session {session.id}")
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+
 @app.post("/deploy")
 async def deploy() -> DeployResponse:
     """Deploy the generated app to Vercel.
@@ -296,6 +870,8 @@ async def deploy() -> DeployResponse:
         raise HTTPException(status_code=400, detail="No session exists. Generate code first.")
 
     workdir = _active_session.workdir
+    if not os.path.isdir(workdir):
+        raise HTTPException(status_code=409, detail=f"Workdir no longer exists: {workdir}")
 
     logger.info(f"Starting Vercel deployment in {workdir}")
 
@@ -303,7 +879,9 @@ async def deploy() -> DeployResponse:
         # Run vercel deploy command with explicit token
         # Per Vercel docs: "When deploying, stdout is always the Deployment URL"
         # Note: VERCEL_TOKEN must be passed via -t flag, not detected from env var
-        result = subprocess.run(
+        # Run in a thread so the deploy doesn't block the event loop
+        result = await asyncio.to_thread(
+            subprocess.run,
             ["vercel", "-t", vercel_token, "deploy", "--prod", "--yes"],
             cwd=workdir,
             capture_output=True,
@@ -352,6 +930,18 @@ async def deploy() -> DeployResponse:
         raise HTTPException(status_code=500, detail=f"Deployment error: {str(e)}")
 
 
+def _process_age_ms() -> float | None:
+    """Milliseconds since this process started (10ms resolution, Linux only)."""
+    try:
+        with open("/proc/self/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return (uptime - int(fields[19]) / os.sysconf("SC_CLK_TCK")) * 1000
+    except (OSError, ValueError, IndexError):
+        return None
+
+
 def _is_port_in_use(port: int) -> bool:
     """Check if a port is already in use."""
     with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
@@ -364,4 +954,6 @@ if __name__ == "__main__":
         logger.error("Tip: Run 'lsof -ti:8000 | xargs kill -9' to kill the process using port 8000")
         sys.exit(1)
 
+    import uvicorn
+
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
@@ -31,6 +31,7 @@ Event Flow:
 No filtering is applied - all SDK events are forwarded to the frontend.
 """
 
+import re
 from enum import Enum
 from typing import Any
 
@@ -48,6 +49,8 @@ class EventType(str, Enum):
     - Result: result (from ResultMessage)
     - User: user_prompt (from UserPromptSubmit hook)
     - System: system, error (metadata and errors)
+    - Summary: summary (compact session progress, server generated)
+    - Diagnostics: diagnostics (background type-check/lint results)
     """
 
     # ========== Lifecycle Events ==========
@@ -83,6 +86,14 @@ class EventType(str, Enum):
     SYSTEM = "system"  # SystemMessage - System metadata
     ERROR = "error"  # Error occurred
 
+    # ========== Summary Events ==========
+    """Periodic session progress pushed by the server"""
+    SUMMARY = "summary"  # SessionSummary snapshot
+
+    # ========== Diagnostics Events ==========
+    """Background type-check and lint results"""
+    DIAGNOSTICS = "diagnostics"  # Fresh tsc/ESLint diagnostics for the workdir
+
 
 class AgentEvent(BaseModel):
     """Base event model for Agent SSE streaming.
@@ -100,3 +111,25 @@ class AgentEvent(BaseModel):
     data: dict[str, Any] = {}
 
     model_config = {"use_enum_values": True}
+
+
+# A tool response that is an error message (Claude CLI tool errors)
+_TOOL_ERROR_MESSAGE = re.compile(r"^\s*(<tool_use_error>|Error\b)")
+# Compiler and build failures in command output
+_COMMAND_ERROR_TEXT = re.compile(r"\berror\b|failed to compile", re.IGNORECASE)
+
+
+def is_tool_error(tool_response: Any) -> bool:
+    """Whether a PostToolUse `tool_response` reports a failed tool call.
+
+    Looks at explicit error flags, error messages and command output; file
+    contents echoed back by Read/Write/Edit are not inspected.
+    """
+    if isinstance(tool_response, str):
+        return bool(_TOOL_ERROR_MESSAGE.match(tool_response))
+    if isinstance(tool_response, dict):
+        if tool_response.get("is_error") or tool_response.get("error"):
+            return True
+        output = f"{tool_response.get('stdout') or ''}\n{tool_response.get('stderr') or ''}"
+        return bool(_COMMAND_ERROR_TEXT.search(output))
+    return False
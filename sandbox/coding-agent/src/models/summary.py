@@ -0,0 +1,127 @@
+"""Running session summary for progress reporting.
+
+The summary is folded from the event stream as events are added to a session,
+so serving it never requires replaying the full event history. Each call to
+``SessionSummary.apply`` does a constant amount of work per event.
+
+Phases mirror the ``AgentStepType`` values used by the frontend
+(``lib/agent-workflow.ts``).
+"""
+
+from typing import Any, Literal
+
+from pydantic import BaseModel, PrivateAttr
+
+from .events import AgentEvent, EventType, is_tool_error
+
+
+Phase = Literal["planning", "writing", "linting", "building", "starting", "ready", "error", "fixing"]
+
+# Event types that carry content produced by an assistant message
+_ASSISTANT_EVENT_TYPES = {EventType.TEXT.value, EventType.THINKING.value, EventType.TOOL_USE.value}
+
+# Tools whose input contains a file path that gets written
+_WRITE_TOOLS = {"Write", "Edit", "MultiEdit", "NotebookEdit"}
+
+# Bash command keywords mapped to phases, checked in order
+_BASH_PHASES: list[tuple[tuple[str, ...], Phase]] = [
+    (("lint", "eslint"), "linting"),
+    (("build", "tsc"), "building"),
+    (("npm run dev", "npm start", "next dev", "next start"), "starting"),
+]
+
+
+class SessionSummary(BaseModel):
+    """Compact, incrementally maintained summary of a session."""
+
+    session_id: str
+    status: Literal["running", "completed", "error"] = "running"
+    phase: Phase = "planning"
+    started_at: float | None = None
+    updated_at: float | None = None
+    event_count: int = 0
+    num_turns: int = 0
+    files_written: dict[str, int] = {}  # path -> number of writes
+    tool_calls: dict[str, int] = {}  # tool name -> call count
+    tool_time_ms: dict[str, float] = {}  # tool name -> cumulative duration
+    error_count: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    total_cost_usd: float | None = None
+
+    # Whether the last event belonged to an assistant message (turn tracking)
+    _last_was_assistant: bool = PrivateAttr(default=False)
+    # Whether the last tool result was an error (used to detect "fixing")
+    _last_tool_failed: bool = PrivateAttr(default=False)
+
+    def apply(self, event: AgentEvent) -> None:
+        """Fold a single event into the summary."""
+        event_type = event.type
+        data = event.data
+
+        self.event_count += 1
+        self.updated_at = event.timestamp
+
+        is_assistant = event_type in _ASSISTANT_EVENT_TYPES
+        if is_assistant and not self._last_was_assistant:
+            self.num_turns += 1
+        self._last_was_assistant = is_assistant
+
+        if event_type == EventType.STARTED:
+            self.started_at = event.timestamp
+            self.phase = "planning"
+
+        elif event_type == EventType.PRE_TOOL_USE:
+            self._apply_pre_tool_use(data.get("tool_name", "unknown"), data.get("tool_input") or {})
+
+        elif event_type == EventType.POST_TOOL_USE:
+            tool_name = data.get("tool_name", "unknown")
+            self.tool_time_ms[tool_name] = self.tool_time_ms.get(tool_name, 0.0) + (
+                data.get("duration_ms") or 0.0
+            )
+            # Tool results come in UserMessages the runner skips; use the hook's response
+            self._last_tool_failed = is_tool_error(data.get("tool_response"))
+
+        elif event_type == EventType.RESULT:
+            self._apply_result(data)
+
+        elif event_type == EventType.COMPLETED:
+            self.status = "completed"
+            self.phase = "ready"
+
+        elif event_type == EventType.ERROR:
+            self.error_count += 1
+            self.status = "error"
+            self.phase = "error"
+
+    def _apply_pre_tool_use(self, tool_name: str, tool_input: dict[str, Any]) -> None:
+        """Count the tool call and derive the current phase from it."""
+        self.tool_calls[tool_name] = self.tool_calls.get(tool_name, 0) + 1
+
+        if tool_name in _WRITE_TOOLS:
+            path = tool_input.get("file_path") or tool_input.get("notebook_path")
+            if path:
+                self.files_written[path] = self.files_written.get(path, 0) + 1
+            self.phase = "fixing" if self._last_tool_failed else "writing"
+
+        elif tool_name == "Bash":
+            command = str(tool_input.get("command", ""))
+            for keywords, phase in _BASH_PHASES:
+                if any(keyword in command for keyword in keywords):
+                    self.phase = phase
+                    break
+
+    def _apply_result(self, data: dict[str, Any]) -> None:
+        """Take authoritative turn, token and cost figures from a result event."""
+        if data.get("num_turns") is not None:
+            self.num_turns = data["num_turns"]
+        if data.get("total_cost_usd") is not None:
+            self.total_cost_usd = data["total_cost_usd"]
+
+        usage = data.get("usage") or {}
+        self.input_tokens = (
+            (usage.get("input_tokens") or 0)
+            + (usage.get("cache_creation_input_tokens") or 0)
+            + (usage.get("cache_read_input_tokens") or 0)
+        )
+        self.output_tokens = usage.get("output_tokens") or 0
@@ -0,0 +1,147 @@
+"""Event loop health monitoring.
+
+The runner, hooks and SSE generators all share one asyncio loop, so any
+coroutine that blocks it stalls every stream. Two pieces watch for that:
+
+- A heartbeat coroutine wakes every `interval` seconds and records how late
+  it woke up (loop lag).
+- A watchdog thread checks the heartbeat. When the loop has been stuck for
+  longer than `slow_threshold`, it captures the loop thread's stack and the
+  task that is running, and logs them once per stall.
+"""
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+# Innermost frames included in the log line (the full stack is kept in stats)
+LOGGED_FRAMES = 15
+
+
+class SlowCallback(BaseModel):
+    """A stall of the event loop, captured while it was happening."""
+
+    timestamp: float
+    blocked_ms: float  # How long the loop had been blocked when captured
+    task: str | None  # Task running at the time, if any
+    stack: list[str]
+
+
+class LoopMonitor:
+    """Measures event loop lag and captures stacks of slow callbacks."""
+
+    def __init__(
+        self,
+        interval: float = 0.1,
+        slow_threshold: float = 0.25,
+        history: int = 50,
+    ):
+        self.interval = interval
+        self.slow_threshold = slow_threshold
+        self.slow_callbacks: deque[SlowCallback] = deque(maxlen=history)
+        self._lags: deque[float] = deque(maxlen=600)  # last ~minute at the default interval
+        self._max_lag = 0.0
+        self._heartbeat = time.monotonic()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread_id: int | None = None
+        self._task: asyncio.Task | None = None
+        self._stopped = threading.Event()
+
+    def start(self) -> None:
+        """Start the heartbeat and watchdog; call from the running loop."""
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._beat(), name="loop-monitor")
+        threading.Thread(target=self._watch, name="loop-watchdog", daemon=True).start()
+
+    async def stop(self) -> None:
+        """Stop monitoring."""
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+
+    def stats(self) -> dict:
+        """Loop lag statistics and recent slow callbacks."""
+        lags = sorted(self._lags)
+        return {
+            "interval_ms": self.interval * 1000,
+            "slow_threshold_ms": self.slow_threshold * 1000,
+            "lag_ms": {
+                "current": round(self._lags[-1] * 1000, 2) if self._lags else 0.0,
+                "p50": round(_percentile(lags, 0.50) * 1000, 2),
+                "p99": round(_percentile(lags, 0.99) * 1000, 2),
+                "max": round(self._max_lag * 1000, 2),
+            },
+            "slow_callbacks": [callback.model_dump() for callback in self.slow_callbacks],
+        }
+
+    async def _beat(self) -> None:
+        """Record how late each wake-up is."""
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(now - expected, 0.0)
+            self._lags.append(lag)
+            self._max_lag = max(self._max_lag, lag)
+            self._heartbeat = now
+
+    def _watch(self) -> None:
+        """Capture the loop thread's stack when the heartbeat stops."""
+        reported_heartbeat = None
+        while not self._stopped.wait(self.slow_threshold / 2):
+            heartbeat = self._heartbeat
+            blocked = time.monotonic() - heartbeat - self.interval
+            if blocked < self.slow_threshold or heartbeat == reported_heartbeat:
+                continue
+            reported_heartbeat = heartbeat  # One report per stall
+            self._capture(blocked)
+
+    def _capture(self, blocked: float) -> None:
+        """Record and log what the loop thread is doing right now."""
+        frame = sys._current_frames().get(self._loop_thread_id or 0)
+        if frame is None:
+            return
+        stack = [line.rstrip() for line in traceback.format_stack(frame)]
+        task = self._running_task()
+
+        callback = SlowCallback(
+            timestamp=time.time(),
+            blocked_ms=blocked * 1000,
+            task=task,
+            stack=stack,
+        )
+        self.slow_callbacks.append(callback)
+        logger.warning(
+            f"Event loop blocked for {callback.blocked_ms:.0f}ms in task {task}:\n"
+            + "\n".join(stack[-LOGGED_FRAMES:])
+        )
+
+    def _running_task(self) -> str | None:
+        """Describe the task the loop is running (read from another thread, best effort)."""
+        if self._loop is None:
+            return None
+        try:
+            task = asyncio.current_task(self._loop)
+        except RuntimeError:
+            return None
+        if task is None:
+            return None
+        return f"{task.get_name()} ({task.get_coro()!r})"
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    """Percentile of pre-sorted values (0 if empty)."""
+    if not values:
+        return 0.0
+    return values[min(int(len(values) * fraction), len(values) - 1)]
@@ -0,0 +1,61 @@
+"""Time-boxed sampling profiler for the live server.
+
+A background thread samples the stacks of all other threads at a fixed
+rate and counts identical stacks. The result is in collapsed-stack format
+(one ``frame;frame;frame count`` line per stack), which flamegraph.pl,
+speedscope and inferno read directly.
+
+Sampling only reads frames, so the overhead is a short GIL hold per sample
+and does not depend on how busy the server is.
+"""
+
+import sys
+import threading
+import time
+from collections import Counter
+from types import FrameType
+
+MAX_DURATION = 60.0
+MAX_HZ = 1000
+
+
+def sample(duration: float, hz: int = 100) -> str:
+    """Sample all threads for duration seconds and return collapsed stacks.
+
+    Blocking; run via ``asyncio.to_thread``.
+    """
+    duration = min(duration, MAX_DURATION)
+    interval = 1 / min(max(hz, 1), MAX_HZ)
+    profiler_thread = threading.get_ident()
+    thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+
+    counts: Counter[str] = Counter()
+    deadline = time.monotonic() + duration
+    next_sample = time.monotonic()
+    while next_sample < deadline:
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == profiler_thread:
+                continue
+            name = thread_names.get(thread_id)
+            if name is None:
+                thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+                name = thread_names.get(thread_id, f"thread-{thread_id}")
+            counts[_collapse(name, frame)] += 1
+
+        next_sample += interval
+        delay = next_sample - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    return "".join(f"{stack} {count}\n" for stack, count in counts.most_common())
+
+
+def _collapse(thread_name: str, frame: FrameType | None) -> str:
+    """Render a stack root-first as semicolon-separated frames."""
+    frames = []
+    while frame is not None:
+        code = frame.f_code
+        frames.append(f"{code.co_name} ({code.co_filename}:{frame.f_lineno})")
+        frame = frame.f_back
+    frames.append(thread_name)
+    return ";".join(reversed(frames))
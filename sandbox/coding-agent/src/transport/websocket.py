@@ -0,0 +1,284 @@
+"""WebSocket transport for session events and client control messages.
+
+One connection carries both directions:
+
+Server -> client::
+
+    {"op": "hello", "session_id": ..., "encoding": ..., "window": ..., "filter": ...}
+    {"op": "event", "seq": 1, "type": "text", "timestamp": ..., "data": {...}}
+    {"op": "reply", "id": ..., "ok": true, ...}   # answer to a control message
+    {"op": "end", "session_id": ..., "status": "completed"}
+
+Client -> server::
+
+    {"op": "ack", "seq": 42}                       # cumulative
+    {"op": "cancel", "id": 1}
+    {"op": "follow_up", "id": 2, "prompt": "..."}
+    {"op": "filter", "id": 3, "mode": "compact"}
+
+Event frames carry the same `type`/`timestamp`/`data` as `AgentEvent`, plus a
+sequence number. The server keeps at most `window` unacknowledged event
+frames in flight and pauses delivery until the client acks.
+
+The connection stays open after `end`: a follow-up sent once the session has
+finished starts a new generation in the same workdir, and its events
+continue on the same connection (with a new `hello`).
+
+Frames are msgpack in binary messages by default (`?encoding=msgpack`), or
+JSON in text messages with `?encoding=json`.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from typing import TYPE_CHECKING, Any, Awaitable, Callable
+
+import msgpack
+from fastapi import HTTPException, WebSocket, WebSocketDisconnect
+
+from ..models.events import AgentEvent, EventType
+
+if TYPE_CHECKING:
+    from ..main import Session
+
+logger = logging.getLogger(__name__)
+
+# Event types left out by each filter mode
+FILTER_MODES: dict[str, set[str]] = {
+    "all": set(),
+    "no_thinking": {EventType.THINKING.value},
+    "compact": {
+        EventType.THINKING.value,
+        EventType.TOOL_RESULT.value,
+        EventType.PRE_TOOL_USE.value,
+        EventType.POST_TOOL_USE.value,
+    },
+    # Only lifecycle events, plus a summary event whenever the session changes
+    "summary": {event_type.value for event_type in EventType}
+    - {
+        EventType.STARTED.value,
+        EventType.COMPLETED.value,
+        EventType.RESULT.value,
+        EventType.ERROR.value,
+        EventType.SUMMARY.value,
+    },
+}
+
+DEFAULT_WINDOW = 64
+MAX_WINDOW = 1024
+
+# Minimum seconds between summary events in "summary" mode
+SUMMARY_INTERVAL = 1.0
+
+
+class EventSocket:
+    """Serves one WebSocket connection for a session."""
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        session: "Session",
+        start_generation: Callable[[str, str], Awaitable["Session"]],
+        encoding: str = "msgpack",
+        window: int = DEFAULT_WINDOW,
+        mode: str = "all",
+    ):
+        self.websocket = websocket
+        self.session = session
+        self.start_generation = start_generation
+        self.binary = encoding == "msgpack"
+        self.window = min(max(window, 1), MAX_WINDOW)
+        self.mode = mode if mode in FILTER_MODES else "all"
+
+        self._seq = 0  # last event frame sent
+        self._acked = 0  # last event frame acknowledged
+        self._acks = asyncio.Event()
+        self._send_lock = asyncio.Lock()
+        self._session_changed = asyncio.Event()
+        self._last_summary = 0.0
+        self._summary_count = -1
+
+    async def serve(self) -> None:
+        """Stream events and handle control messages until either side stops."""
+        writer = asyncio.create_task(self._write_events())
+        reader = asyncio.create_task(self._read_messages())
+        try:
+            done, _ = await asyncio.wait({writer, reader}, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                task.result()
+        except WebSocketDisconnect:
+            pass
+        finally:
+            writer.cancel()
+            reader.cancel()
+        logger.info(f"WebSocket closed for session {self.session.id}")
+
+    async def _write_events(self) -> None:
+        """Send each session's historical then live events, respecting the ack window."""
+        while True:
+            session = self.session
+            await self._stream_session(session)
+            # Wait for a follow-up to start the next generation
+            while self.session is session:
+                self._session_changed.clear()
+                await self._session_changed.wait()
+
+    async def _stream_session(self, session: "Session") -> None:
+        """Send one session's events until it finishes."""
+        self._summary_count = -1
+        await self._send(
+            {
+                "op": "hello",
+                "session_id": session.id,
+                "encoding": "msgpack" if self.binary else "json",
+                "window": self.window,
+                "filter": self.mode,
+                "filter_modes": list(FILTER_MODES),
+            }
+        )
+
+        index = 0
+        while True:
+            while index < len(session.events):
+                event = session.events[index]
+                index += 1
+                if event.type in FILTER_MODES[self.mode]:
+                    continue
+                await self._send_event(event)
+
+            if self.mode == "summary":
+                await self._maybe_send_summary(session)
+
+            if session.status != "running" and index >= len(session.events):
+                if self.mode == "summary":
+                    await self._maybe_send_summary(session, force=True)
+                await self._send({"op": "end", "session_id": session.id, "status": session.status})
+                return
+
+            await session.wait_for_events(index, timeout=SUMMARY_INTERVAL)
+
+    async def _send_event(self, event: AgentEvent) -> None:
+        """Send one event frame, first waiting for the client to ack if the window is full."""
+        while self._seq - self._acked >= self.window:
+            self._acks.clear()
+            await self._acks.wait()
+        self._seq += 1
+        await self._send({"op": "event", "seq": self._seq, **event.model_dump(mode="json")})
+
+    async def _maybe_send_summary(self, session: "Session", force: bool = False) -> None:
+        """Send a summary event if the session changed since the last one."""
+        now = time.monotonic()
+        count = session.summary.event_count
+        if count == self._summary_count and not force:
+            return
+        if now - self._last_summary < SUMMARY_INTERVAL and not force:
+            return
+        self._summary_count = count
+        self._last_summary = now
+        await self._send_event(
+            AgentEvent(
+                type=EventType.SUMMARY,
+                timestamp=time.time(),
+                data=session.get_summary().model_dump(),
+            )
+        )
+
+    async def _read_messages(self) -> None:
+        """Handle acks and control messages from the client."""
+        while True:
+            message = await self.websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            try:
+                payload = self._decode(message)
+            except ValueError as e:
+                await self._reply(None, False, error=f"Invalid frame: {e}")
+                continue
+            try:
+                await self._handle(payload)
+            except (WebSocketDisconnect, asyncio.CancelledError):
+                raise
+            except Exception as e:
+                # A bad message must not take the connection down
+                logger.error(f"Failed to handle WebSocket message {payload!r}: {e}", exc_info=True)
+                await self._reply(payload.get("id"), False, error="Internal error")
+
+    async def _handle(self, payload: dict[str, Any]) -> None:
+        """Dispatch one client message."""
+        op = payload.get("op")
+        message_id = payload.get("id")
+        if not isinstance(op, str):
+            await self._reply(message_id, False, error="Missing op")
+            return
+
+        if op == "ack":
+            seq = payload.get("seq")
+            if isinstance(seq, int) and self._acked < seq <= self._seq:
+                self._acked = seq
+                self._acks.set()
+            return
+
+        if op == "cancel":
+            cancelled = self.session.cancel()
+            await self._reply(message_id, cancelled, error=None if cancelled else "Not running")
+
+        elif op == "follow_up":
+            prompt = payload.get("prompt")
+            if not isinstance(prompt, str) or not prompt:
+                await self._reply(message_id, False, error="Missing prompt")
+            elif self.session.add_follow_up(prompt):
+                await self._reply(message_id, True, session_id=self.session.id)
+            elif self.session.status == "running":
+                await self._reply(message_id, False, error="Agent is not ready for follow-ups yet")
+            else:
+                # Session finished: start a new generation in the same workdir
+                try:
+                    session = await self.start_generation(prompt, self.session.workdir)
+                except HTTPException as e:
+                    await self._reply(message_id, False, error=str(e.detail))
+                else:
+                    self.session = session
+                    self._session_changed.set()
+                    await self._reply(message_id, True, session_id=session.id)
+
+        elif op == "filter":
+            mode = payload.get("mode")
+            if not isinstance(mode, str) or mode not in FILTER_MODES:
+                await self._reply(message_id, False, error=f"Unknown filter mode: {mode}")
+            else:
+                self.mode = mode
+                await self._reply(message_id, True, filter=mode)
+
+        else:
+            await self._reply(message_id, False, error=f"Unknown op: {op}")
+
+    async def _reply(self, message_id: Any, ok: bool, error: str | None = None, **fields: Any) -> None:
+        """Answer a control message."""
+        if not isinstance(message_id, (str, int)):
+            message_id = None  # Only echo ids both encodings can carry
+        reply = {"op": "reply", "id": message_id, "ok": ok, **fields}
+        if error is not None:
+            reply["error"] = error
+        await self._send(reply)
+
+    async def _send(self, payload: dict[str, Any]) -> None:
+        """Encode and send a frame."""
+        async with self._send_lock:
+            if self.binary:
+                await self.websocket.send_bytes(msgpack.packb(payload, use_bin_type=True))
+            else:
+                await self.websocket.send_text(json.dumps(payload, separators=(",", ":")))
+
+    def _decode(self, message: dict[str, Any]) -> dict[str, Any]:
+        """Decode a client frame (msgpack binary or JSON text)."""
+        try:
+            if message.get("bytes") is not None:
+                payload = msgpack.unpackb(message["bytes"], raw=False)
+            else:
+                payload = json.loads(message.get("text") or "")
+        except (msgpack.UnpackException, ValueError) as e:
+            raise ValueError(str(e) or type(e).__name__) from e
+        if not isinstance(payload, dict):
+            raise ValueError("Frame must be an object")
+        return payload